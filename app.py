@@ -1,13 +1,37 @@
+from contextlib import asynccontextmanager
 from modules import api_router, plot_router, web_router
+from modules.scheduler import scheduler
+from modules.worker_pool import worker_pool
+from modules.image_renderer import image_renderer
+from modules.i18n import i18n
+from modules.compression import CompressionMiddleware
+from modules.live_updates import broadcaster
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-import matplotlib
-# Используем не-интерактивный backend для matplotlib (если понадобится)
-matplotlib.use('Agg')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Запускает фоновый сбор данных на время работы приложения."""
+    scheduler.start()
+    # Перезагрузка переводов при изменении locales (если включена)
+    i18n.start_watching()
+    # Рассылка новых замеров открытым страницам (/api/stream)
+    broadcaster.start()
+    yield
+    await broadcaster.stop()
+    i18n.stop_watching()
+    await scheduler.stop()
+    worker_pool.shutdown()
+    image_renderer.shutdown()
 
 
 app = FastAPI(title="LeetCode Progress Tracker",
-              description="Отслеживание прогресса на LeетCode")
+              description="Отслеживание прогресса на LeетCode",
+              lifespan=lifespan)
+
+# Сжатие ответов (gzip/brotli) по Accept-Encoding
+app.add_middleware(CompressionMiddleware)
 
 # Подключаем статические файлы
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -19,4 +43,6 @@ app.include_router(plot_router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from config import SHUTDOWN_TIMEOUT_SECONDS
+    uvicorn.run(app, host="0.0.0.0", port=8000,
+                timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS)
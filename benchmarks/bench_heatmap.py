@@ -0,0 +1,98 @@
+"""Бенчмарк построения тепловой карты активности.
+
+Сравнивает прежнюю реализацию (словарь на каждый прирост и выборка по
+маске для каждой из 7x24 ячеек) с векторизованной weekly_activity и
+проверяет, что результаты совпадают.
+Запуск из корня проекта:
+    python benchmarks/bench_heatmap.py [количество замеров] [пользователей]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.chart_creator import weekly_activity  # noqa: E402
+
+DAYS_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+              'Saturday', 'Sunday']
+
+
+def weekly_activity_loop(df):
+    """Прежняя реализация: построчный сбор приростов и 168 выборок."""
+    activity_data = []
+    for username in df.columns:
+        user_data = df[username].dropna()
+        activity = user_data.diff().fillna(0)
+        activity = activity[activity > 0]
+        for timestamp, value in activity.items():
+            activity_data.append({
+                'activity': value,
+                'hour': timestamp.hour,
+                'day_of_week': timestamp.strftime('%A'),
+                'weekday': timestamp.weekday()
+            })
+
+    heatmap = np.zeros((7, 24))
+    if not activity_data:
+        return heatmap
+    activity_df = pd.DataFrame(activity_data)
+    heatmap_data = activity_df.groupby(['day_of_week', 'weekday', 'hour'])[
+        'activity'].sum().reset_index()
+    for d, day in enumerate(DAYS_ORDER):
+        for hour in range(24):
+            heatmap[d, hour] = heatmap_data[
+                (heatmap_data['day_of_week'] == day) &
+                (heatmap_data['hour'] == hour)
+            ]['activity'].sum()
+    return heatmap
+
+
+def make_frame(samples, users):
+    """Создает широкую таблицу с пропусками, как у реальных замеров."""
+    rng = np.random.default_rng(0)
+    rows = samples // users
+    index = pd.date_range('2020-01-01', periods=rows, freq='17min',
+                          name='timestamp')
+    values = np.cumsum(rng.integers(0, 3, size=(rows, users)),
+                       axis=0).astype(np.float64)
+    values[rng.random((rows, users)) < 0.1] = np.nan
+    return pd.DataFrame(values, index=index,
+                        columns=[f'user{i}' for i in range(users)])
+
+
+def measure(func, *args, repeat=3):
+    """Возвращает лучшее время выполнения и результат."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    df = make_frame(samples, users)
+
+    print(f"Замеров: {df.size}, пользователей: {users}")
+    baseline, expected = measure(weekly_activity_loop, df, repeat=1)
+    print(f"  прежняя реализация:       {baseline:.3f} c")
+
+    elapsed, heatmap = measure(weekly_activity, df)
+    assert np.array_equal(heatmap, expected), "результаты не совпадают"
+    print(f"  weekly_activity:          {elapsed:.3f} c "
+          f"(x{baseline / elapsed:.1f})")
+
+    elapsed, per_user = measure(weekly_activity, df, True)
+    assert np.array_equal(per_user.sum(axis=0), expected)
+    print(f"  weekly_activity per_user: {elapsed:.3f} c")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Бенчмарк кодирования данных графика для ответа.
+
+Сравнивает размер и время построения данных графика общего количества в
+JSON (json и, если установлен, orjson) и в бинарном колоночном формате,
+а также размер ответов после gzip.
+Запуск из корня проекта:
+    python benchmarks/bench_response_encoding.py [точек] [пользователей]
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.binary_format import encode_chart  # noqa: E402
+from modules.chart_cache import serialize_json, orjson  # noqa: E402
+from modules.chart_creator import (  # noqa: E402
+    create_total_plot_data, SERIES_FORMAT_PAIRS, SERIES_FORMAT_BINARY
+)
+
+
+def serialize_stdlib(content):
+    """Сериализация модулем json, как в JSONResponse."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(func, repeat=3):
+    """Возвращает лучшее время выполнения и результат."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rows = points // users
+    index = pd.date_range('2020-01-01', periods=rows, freq='5min')
+    df = pd.DataFrame(
+        np.cumsum(np.random.randint(0, 2, size=(rows, users)),
+                  axis=0).astype('float64'),
+        index=index, columns=[f'user{i}' for i in range(users)])
+
+    variants = [('json', lambda: serialize_stdlib(
+        create_total_plot_data(df, series_format=SERIES_FORMAT_PAIRS)))]
+    if orjson is not None:
+        variants.append(('orjson', lambda: serialize_json(
+            create_total_plot_data(df, series_format=SERIES_FORMAT_PAIRS))))
+    variants.append(('binary', lambda: encode_chart(
+        create_total_plot_data(df, series_format=SERIES_FORMAT_BINARY))))
+
+    print(f"Точек: {rows * users}, пользователей: {users}")
+    for name, build in variants:
+        elapsed, body = measure(build)
+        compressed = len(gzip.compress(body, compresslevel=6))
+        print(f"  {name:<7} {elapsed:.3f} c, {len(body) / 1e6:7.2f} МБ, "
+              f"gzip {compressed / 1e6:6.2f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Бенчмарк кодирования временных рядов для ApexCharts.
+
+Сравнивает прежний построчный цикл с векторизованным encode_series.
+Запуск из корня проекта:
+    python benchmarks/bench_series_encoding.py [количество точек]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.chart_creator import (  # noqa: E402
+    encode_series, SERIES_FORMAT_PAIRS, SERIES_FORMAT_COLUMNS
+)
+
+
+def encode_series_loop(values):
+    """Прежняя реализация: словарь на каждую точку."""
+    data_points = []
+    for timestamp, value in values.items():
+        data_points.append({
+            'x': int(timestamp.timestamp() * 1000),
+            'y': float(value)
+        })
+    return data_points
+
+
+def measure(func, *args, repeat=3):
+    """Возвращает лучшее время выполнения из repeat запусков."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    index = pd.date_range('2020-01-01', periods=points, freq='5min')
+    values = pd.Series(
+        np.cumsum(np.random.randint(0, 2, size=points)).astype('float64'),
+        index=index)
+
+    baseline = measure(encode_series_loop, values, repeat=1)
+    print(f"Точек: {points}")
+    print(f"  цикл по точкам:        {baseline:.3f} c")
+    for series_format in (SERIES_FORMAT_PAIRS, SERIES_FORMAT_COLUMNS):
+        elapsed = measure(encode_series, values, series_format)
+        print(f"  encode_series {series_format:<8} {elapsed:.3f} c "
+              f"(x{baseline / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Бенчмарк холодного старта веб-приложения.
+
+Показывает время импорта app с разбивкой по крупным зависимостям и время
+до первого ответа запущенного uvicorn (страница переводов без данных,
+затем первый запрос, загружающий данные).
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py [порт]
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Зависимости, время загрузки которых показывается отдельно
+PACKAGES = ('fastapi', 'starlette', 'pydantic', 'jinja2', 'pandas', 'numpy',
+            'matplotlib', 'requests', 'modules')
+
+IMPORT_TIME_LINE = re.compile(
+    r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure_imports():
+    """Импортирует app в новом процессе и разбирает вывод -X importtime.
+
+    Returns:
+        tuple: (общее время импорта app в секундах,
+                {пакет: суммарное собственное время его модулей в секундах})
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        if name == 'app':
+            total = int(match.group(2)) / 1e6
+            continue
+        package = name.split('.')[0]
+        if package in PACKAGES:
+            packages[package] = (packages.get(package, 0.0) +
+                                 int(match.group(1)) / 1e6)
+    return total, packages
+
+
+def wait_for(url, deadline):
+    """Опрашивает url до первого успешного ответа и возвращает время."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read()
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(f"Нет ответа от {url}")
+
+
+def measure_first_response(port):
+    """Запускает uvicorn и измеряет время до первых ответов."""
+    base = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app',
+         '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT)
+    try:
+        first = wait_for(f'{base}/api/translations/ru', start + 60)
+        data_start = time.perf_counter()
+        data = wait_for(f'{base}/api/stats', data_start + 60)
+        return first - start, data - data_start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+
+    total, packages = measure_imports()
+    print(f"Импорт app: {total:.3f} c")
+    for name in PACKAGES:
+        if name in packages:
+            print(f"  {name:<12} {packages[name]:.3f} c")
+        else:
+            print(f"  {name:<12} не загружается")
+
+    first, data = measure_first_response(port)
+    print(f"Первый ответ (переводы):     {first:.3f} c после запуска")
+    print(f"Первый ответ с данными:      {data:.3f} c")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,94 @@ CSV_FILE = "leetcode_progress.csv"
 # Имя файла для графика
 PLOT_FILE = "leetcode_progress.png"
 
+# --- ХРАНИЛИЩЕ ---
+# Формат хранения истории замеров: "csv" (файл CSV_FILE) или "numpy"
+# (колоночные бинарные файлы в каталоге NUMPY_STORAGE_DIR, читаются через
+# memory-map). Перенести данные: python migrate_storage.py to-numpy
+STORAGE_BACKEND = "csv"
+# Каталог колоночного хранилища
+NUMPY_STORAGE_DIR = "leetcode_progress_data"
+# Записывать замер пользователя, только если его количества изменились.
+# Время последней проверки каждого пользователя хранится отдельно в
+# HEARTBEAT_FILE. Сжать уже накопленную историю: python migrate_storage.py compact
+RECORD_CHANGES_ONLY = False
+# Файл со временем последней проверки и последними значениями пользователей
+HEARTBEAT_FILE = "leetcode_progress_checked.json"
+
 # --- НАСТРОЙКИ ЗАПРОСОВ ---
 # Таймаут для HTTP запросов (секунды)
 REQUEST_TIMEOUT = 10
+# Максимальное число одновременных запросов к LeetCode при сборе данных
+COLLECTOR_CONCURRENCY = 8
+# Сколько пользователей запрашивать в одном GraphQL запросе. Если сервер
+# отклоняет запрос (ошибки GraphQL без данных, ответ 400 или 413), пакет
+# делится пополам, вплоть до одного пользователя
+COLLECTOR_BATCH_SIZE = 20
+# Сколько раз повторять запрос при ответах 429, 5xx и сетевых ошибках;
+# после этого пакет считается необработанным (без деления)
+COLLECTOR_RETRIES = 2
+# Пауза перед первым повтором (секунды), каждый следующий - вдвое дольше;
+# заголовок Retry-After ответа имеет приоритет
+COLLECTOR_RETRY_DELAY = 1
+# Наибольшая пауза перед повтором (секунды)
+COLLECTOR_MAX_RETRY_DELAY = 30
+
+# --- ПЛАНИРОВЩИК ОБНОВЛЕНИЙ ---
+# Интервал автоматического сбора данных веб-приложением (минуты).
+# 0 - только по запросу (кнопка обновления или POST /api/update)
+UPDATE_INTERVAL_MINUTES = 0
+# Сколько последних заданий обновления хранить для запросов статуса
+UPDATE_JOBS_HISTORY = 50
+
+# --- КЭШИРОВАНИЕ ---
+# Сколько готовых конфигураций графиков хранить в памяти
+CHART_CACHE_SIZE = 128
+
+# --- СЖАТИЕ ОТВЕТОВ ---
+# Ответы не меньше этого размера (байты) сжимаются gzip или brotli (если
+# установлен пакет brotli), если клиент их поддерживает
+COMPRESSION_MIN_SIZE = 1024
+# Сколько сжатых ответов хранить в памяти (по ETag)
+COMPRESSION_CACHE_SIZE = 64
+
+# --- ОБНОВЛЕНИЯ В РЕАЛЬНОМ ВРЕМЕНИ ---
+# Как часто проверять появление новых замеров для /api/stream (секунды),
+# если данные дописывает внешний сборщик; после обновления через
+# приложение события отправляются сразу. 0 - только после обновлений
+# через приложение
+STREAM_POLL_INTERVAL = 5
+# Период комментариев keep-alive в потоке событий (секунды)
+STREAM_KEEPALIVE_SECONDS = 15
+# Сколько событий может ожидать отправки клиенту; если он не успевает их
+# читать, поток закрывается (клиент переподключится и получит пропущенное)
+STREAM_QUEUE_SIZE = 16
+# Сколько секунд при остановке сервера ждать закрытия соединений: потоки
+# /api/stream сами не завершаются, после этого времени они закрываются
+SHUTDOWN_TIMEOUT_SECONDS = 5
+
+# --- ПУЛ ВЫЧИСЛЕНИЙ ---
+# Число потоков для загрузки данных и построения графиков
+WORKER_THREADS = 4
+# Сколько задач может ожидать свободный поток; сверх этого - ответ 503
+WORKER_QUEUE_SIZE = 32
+# Максимальное время ожидания результата задачи (секунды); сверх этого - 504
+WORKER_TIMEOUT_SECONDS = 30
+
+# --- СТАТИЧЕСКИЕ ГРАФИКИ ---
+# Число процессов для рендеринга PNG/SVG/WEBP графиков
+RENDER_PROCESSES = 2
+# Сколько задач рендеринга может ожидать свободный процесс
+RENDER_QUEUE_SIZE = 8
+# Разрешение по умолчанию (размер по умолчанию - FIGURE_SIZE в дюймах)
+RENDER_DPI = 150
+# Сколько готовых изображений хранить в памяти
+IMAGE_CACHE_SIZE = 32
+
+# --- ПЕРЕВОДЫ ---
+# Период проверки изменений в каталоге locales (секунды): переводы
+# перезагружаются без перезапуска приложения, удобно при разработке.
+# 0 - не проверять
+I18N_RELOAD_INTERVAL = 0
 
 # --- НАСТРОЙКИ ГРАФИКА ---
 # Размер фигуры
@@ -28,12 +113,23 @@ TITLE_FONT_SIZE = 18
 AXIS_FONT_SIZE = 12
 # Размер шрифта легенды
 LEGEND_FONT_SIZE = 10
+# Формат точек в данных интерактивных графиков: "pairs" ([[x, y], ...])
+# или "columns" ({"x": [...], "y": [...]}, компактнее для длинных рядов)
+CHART_SERIES_FORMAT = "pairs"
 
 # --- НАСТРОЙКИ CSV ---
 CSV_ENCODING = 'utf-8'
 
 # --- URL И ЗАПРОСЫ ---
 LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql"
+# Поля статистики пользователя, общие для одиночного и пакетного запросов
+USER_STATS_FIELDS = """
+        submitStats: submitStatsGlobal {
+          acSubmissionNum {
+            difficulty
+            count
+          }
+        }"""
 USER_PROFILE_QUERY = """
     query getUserProfile($username: String!) {
       matchedUser(username: $username) {
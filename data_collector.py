@@ -1,23 +1,110 @@
+import asyncio
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-import os
-import csv
 from config import (
-    USERNAMES, CSV_FILE, REQUEST_TIMEOUT,
-    CSV_ENCODING, LEETCODE_GRAPHQL_URL, USER_PROFILE_QUERY
+    USERNAMES, REQUEST_TIMEOUT, COLLECTOR_CONCURRENCY, COLLECTOR_BATCH_SIZE,
+    COLLECTOR_RETRIES, COLLECTOR_RETRY_DELAY, COLLECTOR_MAX_RETRY_DELAY,
+    LEETCODE_GRAPHQL_URL, USER_PROFILE_QUERY, USER_STATS_FIELDS,
+    RECORD_CHANGES_ONLY
 )
+from modules.storage import get_storage, Heartbeat
 
+# Ответы, после которых запрос повторяется с паузой: сервер перегружен или
+# ограничивает частоту запросов
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Ответы, которыми сервер отклоняет сам запрос (например, слишком большой
+# пакет) - такой пакет делится на меньшие
+REJECT_STATUSES = {400, 413}
 
-def get_leetcode_stats(username):
+
+def create_session(pool_size=COLLECTOR_CONCURRENCY):
+    """Создает HTTP сессию с пулом соединений для повторного использования TCP/TLS."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def retry_delay(response, attempt):
+    """Пауза перед повтором: Retry-After ответа или экспоненциальная."""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0),
+                           COLLECTOR_MAX_RETRY_DELAY)
+            except ValueError:
+                # Retry-After в виде даты - используем свою паузу
+                pass
+    return min(COLLECTOR_RETRY_DELAY * 2 ** attempt, COLLECTOR_MAX_RETRY_DELAY)
+
+
+def post_query(payload, session=None, url=LEETCODE_GRAPHQL_URL):
+    """Отправляет GraphQL запрос, повторяя его при 429, 5xx и сетевых ошибках.
+
+    Returns:
+        requests.Response с любым статусом, кроме повторяемых
+
+    Raises:
+        requests.exceptions.RequestException: если повторы не помогли
+    """
+    for attempt in range(COLLECTOR_RETRIES + 1):
+        response = None
+        try:
+            response = (session or requests).post(
+                url,
+                json=payload,
+                timeout=REQUEST_TIMEOUT)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            response.raise_for_status()
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.HTTPError):
+            if attempt == COLLECTOR_RETRIES:
+                raise
+        time.sleep(retry_delay(response, attempt))
+
+
+def parse_user_stats(matched_user):
+    """Извлекает количество решенных задач по уровням сложности из ответа API."""
+    stats = matched_user["submitStats"]["acSubmissionNum"]
+
+    # Извлекаем данные по уровням сложности
+    result = {
+        'total': 0,
+        'easy': 0,
+        'medium': 0,
+        'hard': 0
+    }
+
+    for item in stats:
+        difficulty = item['difficulty'].lower()
+        count = item['count']
+
+        if difficulty == 'all':
+            result['total'] = count
+        elif difficulty == 'easy':
+            result['easy'] = count
+        elif difficulty == 'medium':
+            result['medium'] = count
+        elif difficulty == 'hard':
+            result['hard'] = count
+
+    return result
+
+
+def get_leetcode_stats(username, session=None, url=LEETCODE_GRAPHQL_URL):
     """Получает статистику решенных задач для пользователя по уровням сложности."""
     variables = {"username": username}
     payload = {"query": USER_PROFILE_QUERY, "variables": variables}
 
     try:
-        response = requests.post(
-            LEETCODE_GRAPHQL_URL,
-            json=payload,
-            timeout=REQUEST_TIMEOUT)
+        response = post_query(payload, session, url)
         response.raise_for_status()
         data = response.json()
 
@@ -25,30 +112,7 @@ def get_leetcode_stats(username):
             print(f"Ошибка: Пользователь '{username}' не найден.")
             return None
 
-        stats = data["data"]["matchedUser"]["submitStats"]["acSubmissionNum"]
-
-        # Извлекаем данные по уровням сложности
-        result = {
-            'total': 0,
-            'easy': 0,
-            'medium': 0,
-            'hard': 0
-        }
-
-        for item in stats:
-            difficulty = item['difficulty'].lower()
-            count = item['count']
-
-            if difficulty == 'all':
-                result['total'] = count
-            elif difficulty == 'easy':
-                result['easy'] = count
-            elif difficulty == 'medium':
-                result['medium'] = count
-            elif difficulty == 'hard':
-                result['hard'] = count
-
-        return result
+        return parse_user_stats(data["data"]["matchedUser"])
     except requests.exceptions.RequestException as e:
         print(f"Ошибка сети при запросе для {username}: {e}")
         return None
@@ -57,43 +121,196 @@ def get_leetcode_stats(username):
         return None
 
 
-def update_progress_data():
-    """Добавляет новые замеры в CSV файл в "длинном" формате."""
-    # Проверяем, существует ли файл, и если нет - создаем с заголовками
-    if not os.path.exists(CSV_FILE):
-        with open(CSV_FILE, 'w', newline='', encoding=CSV_ENCODING) as f:
-            writer = csv.writer(f)
-            # Новые заголовки с детализацией по сложности
-            headers = [
-                'timestamp',
-                'username',
-                'total_solved',
-                'easy_solved',
-                'medium_solved',
-                'hard_solved']
-            writer.writerow(headers)
-
-    # Открываем файл для добавления данных
-    with open(CSV_FILE, 'a', newline='', encoding=CSV_ENCODING) as f:
-        writer = csv.writer(f)
-        now_iso = datetime.now().isoformat()
-
-        print("-" * 30)
-        print(
-            f"Запуск обновления данных: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-        for username in USERNAMES:
-            stats = get_leetcode_stats(username)
-            if stats is not None:
-                writer.writerow([
-                    now_iso, username,
-                    stats['total'], stats['easy'], stats['medium'], stats['hard']
-                ])
-                print(
-                    f"  - {username}: {stats['total']} задач (E:{stats['easy']}, M:{stats['medium']}, H:{stats['hard']}). Запись добавлена.")
+def build_batch_query(usernames):
+    """Строит GraphQL запрос статистики сразу для нескольких пользователей.
+
+    Каждый пользователь запрашивается под своим псевдонимом (u0, u1, ...),
+    имена передаются через переменные запроса.
+    """
+    aliases = [f"u{i}" for i in range(len(usernames))]
+    params = ", ".join(f"${alias}: String!" for alias in aliases)
+    fields = "".join(
+        f"\n      {alias}: matchedUser(username: ${alias}) {{{USER_STATS_FIELDS}\n      }}"
+        for alias in aliases)
+    query = f"\n    query getUsersProfiles({params}) {{{fields}\n    }}\n    "
+    return query, dict(zip(aliases, usernames))
+
+
+def get_leetcode_stats_batch(usernames, session=None, url=LEETCODE_GRAPHQL_URL):
+    """Получает статистику для пакета пользователей одним запросом.
+
+    Возвращает словарь {username: stats или None} или None, если сервер
+    отклонил пакет целиком (тогда пакет нужно разбить на меньшие). При
+    ограничении частоты, ошибках сервера и сети пакет не делится: запрос
+    повторяется с паузой, а если повторы не помогли, все пользователи
+    пакета считаются необработанными.
+    """
+    query, variables = build_batch_query(usernames)
+    payload = {"query": query, "variables": variables}
+    failed = dict.fromkeys(usernames)
+
+    try:
+        response = post_query(payload, session, url)
+        if response.status_code in REJECT_STATUSES:
+            print(f"Сервер отклонил пакет ({len(usernames)} польз.): "
+                  f"HTTP {response.status_code}")
+            return None
+        response.raise_for_status()
+        body = response.json()
+        data = body.get("data")
+        if not data:
+            if body.get("errors"):
+                print(f"Сервер отклонил пакет ({len(usernames)} польз.): "
+                      f"{body['errors']}")
+                return None
+            print(f"Пустой ответ на пакетный запрос ({len(usernames)} польз.)")
+            return failed
+
+        results = {}
+        for alias, username in variables.items():
+            matched_user = data.get(alias)
+            if matched_user is None:
+                print(f"Ошибка: Пользователь '{username}' не найден.")
+                results[username] = None
             else:
+                results[username] = parse_user_stats(matched_user)
+        return results
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка сети при пакетном запросе ({len(usernames)} польз.): {e}")
+        return failed
+    except Exception as e:
+        print(
+            f"Произошла ошибка при обработке пакета ({len(usernames)} польз.): {e}")
+        return failed
+
+
+async def fetch_all_stats(usernames, concurrency=COLLECTOR_CONCURRENCY,
+                          url=LEETCODE_GRAPHQL_URL,
+                          batch_size=COLLECTOR_BATCH_SIZE):
+    """Параллельно получает статистику для всех пользователей.
+
+    Пользователи запрашиваются пакетами по batch_size; не более concurrency
+    запросов выполняются одновременно, все они используют общий пул
+    соединений. Возвращает словарь {username: stats или None} в порядке
+    usernames.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    usernames = list(usernames)
+
+    # Отдельный пул потоков: пул по умолчанию может быть меньше concurrency
+    with create_session(concurrency) as session, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run(func, *args):
+            async with semaphore:
+                return await loop.run_in_executor(
+                    executor, func, *args, session, url)
+
+        async def fetch(batch):
+            if len(batch) == 1:
+                return {batch[0]: await run(get_leetcode_stats, batch[0])}
+
+            results = await run(get_leetcode_stats_batch, batch)
+            if results is not None:
+                return results
+
+            # Сервер отклонил пакет - пробуем двумя пакетами поменьше
+            middle = len(batch) // 2
+            halves = await asyncio.gather(
+                fetch(batch[:middle]), fetch(batch[middle:]))
+            return {**halves[0], **halves[1]}
+
+        size = max(batch_size, 1)
+        batches = [usernames[i:i + size]
+                   for i in range(0, len(usernames), size)]
+        parts = await asyncio.gather(*(fetch(batch) for batch in batches))
+
+    results = {}
+    for part in parts:
+        results.update(part)
+    return {username: results.get(username) for username in usernames}
+
+
+def update_progress_data(changes_only=None):
+    """Добавляет новые замеры в хранилище в "длинном" формате.
+
+    Args:
+        changes_only: записывать замер, только если количества пользователя
+            изменились с прошлой проверки (по умолчанию RECORD_CHANGES_ONLY).
+            Время проверки без изменений сохраняется в Heartbeat; перед
+            следующим изменением в историю дописывается последняя такая
+            проверка, чтобы график сохранил ступенчатую форму.
+
+    Returns:
+        dict: Итоги запуска - списки обновленных, не изменившихся и
+        необработанных пользователей
+    """
+    if changes_only is None:
+        changes_only = RECORD_CHANGES_ONLY
+    storage = get_storage()
+    heartbeat = Heartbeat()
+    now_iso = datetime.now().isoformat()
+
+    print("-" * 30)
+    print(
+        f"Запуск обновления данных: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    all_stats = asyncio.run(fetch_all_stats(USERNAMES))
+
+    # Время проверок читается и обновляется вместе с записью истории под
+    # одной блокировкой, чтобы параллельные сборщики не теряли изменения
+    with storage.lock():
+        checks = heartbeat.read()
+        rows = []
+        updated = []
+        unchanged = []
+        failed = []
+        for username, stats in all_stats.items():
+            if stats is None:
                 print(f"  - {username}: не удалось получить данные.")
-        print("-" * 30)
+                failed.append(username)
+                continue
+
+            counts = [stats['total'], stats['easy'], stats['medium'],
+                      stats['hard']]
+            check = checks.get(username)
+            if check is not None and check['checked'] >= now_iso:
+                # Другой сборщик уже сохранил более позднюю проверку
+                unchanged.append(username)
+                continue
+            if (changes_only and check is not None and
+                    check['counts'] == counts):
+                check['checked'] = now_iso
+                unchanged.append(username)
+                print(f"  - {username}: {stats['total']} задач, без изменений.")
+                continue
+
+            if check is not None and check['checked'] != check['recorded']:
+                # Последняя проверка без изменений еще не записана в историю
+                rows.append([check['checked'], username, *check['counts']])
+            rows.append([now_iso, username, *counts])
+            checks[username] = {
+                'checked': now_iso, 'recorded': now_iso, 'counts': counts}
+            updated.append(username)
+            print(
+                f"  - {username}: {stats['total']} задач (E:{stats['easy']}, M:{stats['medium']}, H:{stats['hard']}). Запись добавлена.")
+
+        # Записываем все замеры одного запуска разом; время проверок
+        # сохраняется после истории, чтобы не ссылаться на незаписанные
+        # замеры
+        if rows:
+            rows.sort(key=lambda row: row[0])
+            storage.append(rows)
+        if updated or unchanged:
+            heartbeat.write(checks)
+    print("-" * 30)
+
+    return {
+        'timestamp': now_iso,
+        'updated': updated,
+        'unchanged': unchanged,
+        'failed': failed
+    }
 
 
 def main():
@@ -0,0 +1,86 @@
+"""Перенос истории замеров между форматами хранения.
+
+Примеры:
+    python migrate_storage.py to-numpy            # CSV_FILE -> NUMPY_STORAGE_DIR
+    python migrate_storage.py export-csv          # NUMPY_STORAGE_DIR -> CSV_FILE
+    python migrate_storage.py export-csv out.csv  # NUMPY_STORAGE_DIR -> out.csv
+    python migrate_storage.py compact             # сжать текущее хранилище
+
+После переноса укажите нужный STORAGE_BACKEND в config.py.
+"""
+
+import argparse
+import sys
+
+from modules.storage import (
+    CsvStorage, NumpyStorage, read_frame, compact_frame, get_storage
+)
+
+
+def migrate(source, target):
+    """Копирует все записи из одного хранилища в другое."""
+    if not source.exists():
+        print("Ошибка: исходное хранилище не найдено.")
+        return False
+
+    df = read_frame(source)
+    target.write_frame(df)
+    print(f"Перенесено записей: {len(df)}")
+    return True
+
+
+def compact(storage):
+    """Удаляет из хранилища повторяющиеся замеры (см. compact_frame)."""
+    if not storage.exists():
+        print("Ошибка: хранилище не найдено.")
+        return False
+
+    # Сборщик не должен дописать записи между чтением и перезаписью
+    with storage.lock():
+        df = read_frame(storage)
+        compacted = compact_frame(df)
+        if len(compacted) < len(df):
+            storage.write_frame(compacted)
+    print(f"Записей было: {len(df)}, осталось: {len(compacted)}")
+    return True
+
+
+def main():
+    """Разбирает аргументы командной строки и выполняет перенос."""
+    parser = argparse.ArgumentParser(
+        description="Перенос истории замеров между CSV и колоночным форматом "
+                    "и сжатие истории.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    to_numpy = subparsers.add_parser(
+        'to-numpy', help="перенести CSV в колоночное хранилище")
+    to_numpy.add_argument('csv_file', nargs='?', default=None,
+                          help="исходный CSV файл (по умолчанию CSV_FILE)")
+
+    export_csv = subparsers.add_parser(
+        'export-csv', help="выгрузить колоночное хранилище в CSV")
+    export_csv.add_argument('csv_file', nargs='?', default=None,
+                            help="целевой CSV файл (по умолчанию CSV_FILE)")
+
+    compact_parser = subparsers.add_parser(
+        'compact',
+        help="удалить повторяющиеся замеры из хранилища STORAGE_BACKEND")
+    compact_parser.add_argument(
+        'backend', nargs='?', default=None, choices=['csv', 'numpy'],
+        help="хранилище (по умолчанию STORAGE_BACKEND)")
+
+    args = parser.parse_args()
+    if args.command == 'compact':
+        return 0 if compact(get_storage(args.backend)) else 1
+
+    csv_storage = CsvStorage(args.csv_file) if args.csv_file else CsvStorage()
+
+    if args.command == 'to-numpy':
+        ok = migrate(csv_storage, NumpyStorage())
+    else:
+        ok = migrate(NumpyStorage(), csv_storage)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
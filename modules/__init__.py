@@ -1,27 +1,42 @@
-"""Модули для LeetCode Progress Tracker."""
-
-from .data_processor import load_and_process_data
-from .chart_creator import (
-    create_progress_plot_data, create_total_plot_data,
-    create_difficulty_breakdown_data, create_daily_progress_data,
-    create_difficulty_total_data, create_difficulty_progress_data,
-    create_weekly_heatmap_data, create_progress_plot, create_total_plot
-)
-from .api_routes import api_router, plot_router
-from .web_views import web_router
-
-__all__ = [
-    'load_and_process_data',
-    'create_progress_plot_data',
-    'create_total_plot_data',
-    'create_difficulty_breakdown_data',
-    'create_daily_progress_data',
-    'create_difficulty_total_data',
-    'create_difficulty_progress_data',
-    'create_weekly_heatmap_data',
-    'create_progress_plot',
-    'create_total_plot',
-    'api_router',
-    'plot_router',
-    'web_router'
-]
+"""Модули для LeetCode Progress Tracker.
+
+Имена загружаются из подмодулей при первом обращении: так запуск
+приложения не импортирует pandas и matplotlib, пока они не понадобятся.
+"""
+
+import importlib
+
+# Имя -> подмодуль, из которого оно экспортируется
+_EXPORTS = {
+    'load_and_process_data': 'data_processor',
+    'invalidate_cache': 'data_processor',
+    'create_progress_plot_data': 'chart_creator',
+    'create_total_plot_data': 'chart_creator',
+    'create_difficulty_breakdown_data': 'chart_creator',
+    'create_daily_progress_data': 'chart_creator',
+    'create_difficulty_total_data': 'chart_creator',
+    'create_difficulty_progress_data': 'chart_creator',
+    'create_weekly_heatmap_data': 'chart_creator',
+    'chart_templates': 'chart_creator',
+    'create_progress_plot': 'chart_creator',
+    'create_total_plot': 'chart_creator',
+    'api_router': 'api_routes',
+    'plot_router': 'api_routes',
+    'web_router': 'web_views'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Импортирует подмодуль при первом обращении к экспортируемому имени."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
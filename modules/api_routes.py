@@ -1,20 +1,28 @@
 """API роутеры для LeetCode Progress Tracker."""
 
-from fastapi import APIRouter, HTTPException, Form, Request, Cookie
-from fastapi.responses import JSONResponse, StreamingResponse
-import subprocess
-import sys
-
-from modules.data_processor import load_and_process_data
-from modules.utils import get_latest_value
-from modules.chart_creator import (
-    create_progress_plot_data, create_total_plot_data,
-    create_difficulty_breakdown_data, create_daily_progress_data,
-    create_difficulty_total_data, create_difficulty_progress_data,
-    create_weekly_heatmap_data, create_progress_plot, create_total_plot
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+from typing import Optional
+
+from fastapi import (
+    APIRouter, HTTPException, Form, Request, Cookie, Query, Depends, Header
+)
+from fastapi.responses import Response, RedirectResponse, StreamingResponse
+
+from modules.chart_cache import (
+    chart_cache, image_cache, serialize_json, CachedPayload, IMMUTABLE
+)
+from modules.utils import DataFilter, RESOLUTIONS
+from modules.binary_format import MEDIA_TYPE as BINARY_MEDIA_TYPE
+from modules.image_renderer import (
+    image_renderer, frame_to_arrays, IMAGE_FORMATS
 )
 from modules.i18n import i18n
-from config import USERNAMES
+from modules.live_updates import broadcaster
+from modules.scheduler import scheduler
+from modules.worker_pool import worker_pool
+from config import USERNAMES, RENDER_DPI
 
 
 # Создаем роутер для API
@@ -24,246 +32,496 @@ api_router = APIRouter(prefix="/api")
 plot_router = APIRouter(prefix="/plot")
 
 
-@api_router.get("/plot/progress")
-async def get_progress_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
-    """Возвращает данные для интерактивного графика прогресса."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['progress_total'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Нет данных для построения графика прогресса")
+def _to_local_naive(value):
+    """Приводит время к локальному времени без часового пояса.
+
+    Замеры хранятся в локальном времени без указания часового пояса.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def get_data_filter(
+        start: Optional[datetime] = Query(default=None, alias="from"),
+        end: Optional[datetime] = Query(default=None, alias="to"),
+        users: Optional[str] = Query(default=None)):
+    """Разбирает параметры from, to и users в фильтр данных.
+
+    users - список пользователей через запятую.
+
+    Returns:
+        DataFilter или None, если фильтр не задан
+    """
+    start = _to_local_naive(start)
+    end = _to_local_naive(end)
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=400,
+            detail="Начало диапазона позже его конца.")
+
+    selected = None
+    if users is not None:
+        selected = tuple(dict.fromkeys(
+            username.strip() for username in users.split(',')
+            if username.strip()))
 
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_progress_plot_data(
-            data_dict['progress_total'], language)
+    if start is None and end is None and selected is None:
+        return None
+    return DataFilter(start, end, selected)
 
-        return JSONResponse(content=chart_config)
+
+def get_resolution(resolution: Optional[str] = Query(default=None)):
+    """Проверяет параметр resolution (интервал агрегации данных)."""
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный интервал агрегации: {resolution}. "
+                   f"Допустимые значения: {', '.join(RESOLUTIONS)}")
+    return resolution
+
+
+# Описание интерактивного графика: колонки данных, без которых он не
+# строится, сообщение об их отсутствии, функция построения (получает модуль
+# chart_creator, данные, переводчик, max_points и формат рядов), поддержка
+# прореживания (max_points и resolution), название графика для журнала
+# ошибок, интервал агрегации, по которому график строится, если resolution
+# не задан (None - исходные замеры), и шаблон оформления из
+# chart_creator.chart_templates (None - имя графика)
+ChartSpec = namedtuple(
+    'ChartSpec',
+    ['required', 'missing_detail', 'build', 'downsampled', 'label',
+     'resolution', 'template'],
+    defaults=(None, None))
+
+DIFFICULTY_MISSING_DETAIL = (
+    "Данные о сложности недоступны. Обновите данные для получения "
+    "детальной статистики.")
+
+CHARTS = {
+    'progress': ChartSpec(
+        ('progress_total',),
+        "Нет данных для построения графика прогресса",
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_progress_plot_data(
+                data_dict['progress_total'], max_points, series_format),
+        True, "графика прогресса"),
+    'total': ChartSpec(
+        ('total',),
+        "Нет данных для построения графика общего количества",
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_total_plot_data(
+                data_dict['total'], max_points, series_format),
+        True, "графика общего количества"),
+    'difficulty-breakdown': ChartSpec(
+        ('easy', 'medium', 'hard'),
+        DIFFICULTY_MISSING_DETAIL,
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_difficulty_breakdown_data(
+                data_dict['easy'], data_dict['medium'], data_dict['hard'],
+                translator),
+        False, "графика по сложности"),
+    'daily-progress': ChartSpec(
+        ('total',),
+        "Нет данных для построения дневного графика",
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_daily_progress_data(
+                data_dict, max_points, series_format),
+        True, "дневного графика", 'day'),
+    'difficulty-total': ChartSpec(
+        ('easy', 'medium', 'hard'),
+        DIFFICULTY_MISSING_DETAIL,
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_difficulty_total_data(
+                data_dict['easy'], data_dict['medium'], data_dict['hard'],
+                max_points, series_format),
+        True, "графика общего количества по сложности"),
+    'difficulty-progress': ChartSpec(
+        ('progress_easy', 'progress_medium', 'progress_hard'),
+        DIFFICULTY_MISSING_DETAIL,
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_difficulty_progress_data(
+                data_dict['progress_easy'],
+                data_dict['progress_medium'],
+                data_dict['progress_hard'], max_points, series_format),
+        True, "графика прогресса по сложности"),
+    'weekly-heatmap': ChartSpec(
+        ('total',),
+        "Нет данных для построения тепловой карты",
+        lambda charts, data_dict, translator, max_points, series_format:
+            charts.create_weekly_heatmap_data(data_dict),
+        False, "тепловой карты"),
+}
+
+# Графики панели по умолчанию
+DASHBOARD_CHARTS = tuple(CHARTS)
+
+# Тепловые карты активности по уровням сложности
+for _metric in ('easy', 'medium', 'hard'):
+    CHARTS[f'weekly-heatmap-{_metric}'] = ChartSpec(
+        (_metric,),
+        DIFFICULTY_MISSING_DETAIL,
+        lambda charts, data_dict, translator, max_points, series_format,
+               metric=_metric:
+            charts.create_weekly_heatmap_data(data_dict, metric),
+        False, f"тепловой карты ({_metric})", template='weekly-heatmap')
+
+
+def _get_translator(lang):
+    """Возвращает переводчик для языка из cookie или языка по умолчанию."""
+    return i18n.translator(lang)
+
+
+def _chart_resolution(name, resolution):
+    """Возвращает интервал агрегации, по которому строится график."""
+    spec = CHARTS[name]
+    if spec.downsampled and resolution is not None:
+        return resolution
+    return spec.resolution
+
+
+def _accepts_binary(request):
+    """Проверяет, запрошены ли данные в бинарном колоночном формате."""
+    return BINARY_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def _build_chart_payload(name, data_dict, version, translator, max_points,
+                         data_filter, resolution, binary=False):
+    """Строит (или берет из кэша) сериализованные данные графика.
+
+    Данные содержат имя шаблона оформления (template), с которым их
+    объединяет app.js. data_dict должен быть загружен с интервалом
+    агрегации resolution. При binary данные кодируются в бинарный
+    колоночный формат (см. binary_format).
+    """
+    from modules import chart_creator
+    from modules.binary_format import encode_chart
+
+    spec = CHARTS[name]
+    # Наличие данных проверяется по хранилищу: таблицы строятся только
+    # при построении графика, а не при каждом попадании в кэш
+    if not all(data_dict.has_values(key) for key in spec.required):
+        raise HTTPException(status_code=404, detail=spec.missing_detail)
+
+    if not spec.downsampled:
+        max_points = None
+
+    def build():
+        series_format = chart_creator.SERIES_FORMAT_BINARY if binary else None
+        chart_data = spec.build(chart_creator, data_dict, translator,
+                                max_points, series_format)
+        chart_data['template'] = spec.template or name
+        return encode_chart(chart_data) if binary else chart_data
+
+    return chart_cache.get(
+        (name, translator.language, translator.digest, max_points,
+         data_filter, resolution, binary),
+        version, build)
+
+
+def _chart_response(request, name, lang, max_points, data_filter,
+                    resolution=None):
+    """Возвращает ответ с данными одного графика."""
+    from modules.data_processor import load_data_with_version
+
+    try:
+        resolution = _chart_resolution(name, resolution)
+        data_dict, version = load_data_with_version(data_filter, resolution)
+        translator = _get_translator(lang)
+        binary = _accepts_binary(request)
+        payload = _build_chart_payload(
+            name, data_dict, version, translator, max_points, data_filter,
+            resolution, binary)
+        return chart_cache.payload_response(
+            request, payload,
+            BINARY_MEDIA_TYPE if binary else "application/json",
+            vary='Accept')
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Ошибка создания графика прогресса: {str(e)}")
+        print(f"Ошибка создания {CHARTS[name].label}: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500,
                             detail=f"Ошибка создания графика: {str(e)}")
 
 
+@api_router.get("/plot/progress")
+async def get_progress_plot_data(
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
+    """Возвращает данные для интерактивного графика прогресса."""
+    return await worker_pool.run(
+        _chart_response, request, 'progress', lang, max_points, data_filter,
+        resolution)
+
+
 @api_router.get("/plot/total")
 async def get_total_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
     """Возвращает данные для интерактивного графика общего количества."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['total'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Нет данных для построения графика общего количества")
-
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_total_plot_data(data_dict['total'], language)
-
-        return JSONResponse(content=chart_config)
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Ошибка создания графика общего количества: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await worker_pool.run(
+        _chart_response, request, 'total', lang, max_points, data_filter,
+        resolution)
 
 
 @api_router.get("/plot/difficulty-breakdown")
 async def get_difficulty_breakdown_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter)):
     """Возвращает данные для графика распределения по уровням сложности."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['easy'].empty or data_dict['medium'].empty or data_dict['hard'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Данные о сложности недоступны. Обновите данные для получения детальной статистики.")
-
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_difficulty_breakdown_data(
-            data_dict['easy'], data_dict['medium'], data_dict['hard'], language)
-
-        return JSONResponse(content=chart_config)
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Ошибка создания графика по сложности: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await worker_pool.run(
+        _chart_response, request, 'difficulty-breakdown', lang,
+        None, data_filter)
 
 
 @api_router.get("/plot/daily-progress")
 async def get_daily_progress_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
     """Возвращает данные для графика прогресса по дням."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['total'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Нет данных для построения дневного графика")
-
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_daily_progress_data(data_dict, language)
-
-        return JSONResponse(content=chart_config)
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Ошибка создания дневного графика: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await worker_pool.run(
+        _chart_response, request, 'daily-progress', lang,
+        max_points, data_filter, resolution)
 
 
 @api_router.get("/plot/difficulty-total")
 async def get_difficulty_total_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
     """Возвращает данные для графика общего количества задач по уровням сложности."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['easy'].empty or data_dict['medium'].empty or data_dict['hard'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Данные о сложности недоступны. Обновите данные для получения детальной статистики.")
-
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_difficulty_total_data(
-            data_dict['easy'], data_dict['medium'], data_dict['hard'], language)
-
-        return JSONResponse(content=chart_config)
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(
-            f"Ошибка создания графика общего количества по сложности: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await worker_pool.run(
+        _chart_response, request, 'difficulty-total', lang,
+        max_points, data_filter, resolution)
 
 
 @api_router.get("/plot/difficulty-progress")
 async def get_difficulty_progress_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
     """Возвращает данные для графика прогресса по уровням сложности."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['progress_easy'].empty or data_dict['progress_medium'].empty or data_dict['progress_hard'].empty:
-            raise HTTPException(
-                status_code=404,
-                detail="Данные о сложности недоступны. Обновите данные для получения детальной статистики.")
-
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_difficulty_progress_data(
-            data_dict['progress_easy'],
-            data_dict['progress_medium'],
-            data_dict['progress_hard'], language)
-
-        return JSONResponse(content=chart_config)
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Ошибка создания графика прогресса по сложности: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await worker_pool.run(
+        _chart_response, request, 'difficulty-progress', lang,
+        max_points, data_filter, resolution)
 
 
 @api_router.get("/plot/weekly-heatmap")
 async def get_weekly_heatmap_plot_data(
-        request: Request, lang: str = Cookie(default="ru")):
-    """Возвращает данные для тепловой карты активности."""
-    try:
-        data_dict = load_and_process_data()
-        if data_dict['total'].empty:
+        request: Request, lang: str = Cookie(default="ru"),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        difficulty: Optional[str] = Query(default=None)):
+    """Возвращает данные для тепловой карты активности.
+
+    difficulty - уровень сложности, по которому считается активность
+    (по умолчанию общее количество задач).
+    """
+    name = 'weekly-heatmap'
+    if difficulty is not None:
+        name = f'weekly-heatmap-{difficulty}'
+        if name not in CHARTS:
             raise HTTPException(
-                status_code=404,
-                detail="Нет данных для построения тепловой карты")
+                status_code=400,
+                detail=f"Неизвестный уровень сложности: {difficulty}")
+    return await worker_pool.run(
+        _chart_response, request, name, lang, None, data_filter)
+
+
+@api_router.get("/dashboard")
+async def get_dashboard_data(
+        request: Request, lang: str = Cookie(default="ru"),
+        charts: Optional[str] = Query(default=None),
+        data_filter: Optional[DataFilter] = Depends(get_data_filter),
+        max_points: Optional[int] = Query(default=None, ge=3),
+        resolution: Optional[str] = Depends(get_resolution)):
+    """Возвращает данные нескольких графиков одним ответом.
+
+    charts - имена графиков через запятую (как в /api/plot/*, тепловые
+    карты по сложности - weekly-heatmap-easy и т.д.), по умолчанию все
+    графики. Данные загружаются один раз для всех графиков. Если график
+    не удалось построить, вместо данных возвращается {"error": ...}.
+    """
+    names = list(DASHBOARD_CHARTS)
+    if charts is not None:
+        names = list(dict.fromkeys(
+            name.strip() for name in charts.split(',') if name.strip()))
+        unknown = [name for name in names if name not in CHARTS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестные графики: {', '.join(unknown)}")
+
+    return await worker_pool.run(
+        _dashboard_response, request, names, lang, max_points, data_filter,
+        resolution)
 
-        # Используем язык из cookie или параметра
-        language = lang if lang in i18n.get_supported_languages() else "ru"
-        chart_config = create_weekly_heatmap_data(data_dict, language)
 
-        return JSONResponse(content=chart_config)
+def _dashboard_response(request, names, lang, max_points, data_filter,
+                        resolution=None):
+    """Возвращает ответ с данными нескольких графиков."""
+    from modules.data_processor import load_store_with_version, select_data
+
+    try:
+        store, version = load_store_with_version()
+        translator = _get_translator(lang)
+        binary = _accepts_binary(request)
+
+        def build():
+            from modules.binary_format import encode_dashboard
+
+            # Данные выбираются один раз для каждого интервала агрегации
+            data = {}
+            charts = []
+            for name in names:
+                try:
+                    chart_resolution = _chart_resolution(name, resolution)
+                    if chart_resolution not in data:
+                        data[chart_resolution] = select_data(
+                            store, data_filter, chart_resolution)
+                    chart = _build_chart_payload(
+                        name, data[chart_resolution], version, translator,
+                        max_points, data_filter, chart_resolution,
+                        binary).body
+                except HTTPException as e:
+                    chart = {'error': e.detail}
+                except Exception as e:
+                    print(f"Ошибка создания {CHARTS[name].label}: {str(e)}")
+                    import traceback
+                    traceback.print_exc()
+                    chart = {'error': f"Ошибка создания графика: {str(e)}"}
+                charts.append((name, chart))
+
+            if binary:
+                return encode_dashboard(charts)
+            # Данные графиков уже сериализованы, собираем ответ из них
+            parts = [serialize_json(name) + b':' + (
+                         chart if isinstance(chart, bytes)
+                         else serialize_json(chart))
+                     for name, chart in charts]
+            return b'{"charts":{' + b','.join(parts) + b'}}'
+
+        payload = chart_cache.get(
+            ('dashboard', tuple(names), translator.language,
+             translator.digest, max_points, data_filter, resolution,
+             binary),
+            version, build)
+        return chart_cache.payload_response(
+            request, payload,
+            BINARY_MEDIA_TYPE if binary else "application/json",
+            vary='Accept')
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Ошибка создания тепловой карты: {str(e)}")
+        print(f"Ошибка создания панели графиков: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+                            detail=f"Ошибка создания графиков: {str(e)}")
 
 
 @api_router.post("/update")
 async def update_data():
-    """API endpoint для обновления данных."""
+    """API endpoint для запуска обновления данных в фоне.
+
+    Если обновление уже выполняется, возвращается текущее задание.
+    """
     try:
-        # Запускаем скрипт data_collector.py
-        result = subprocess.run([sys.executable, "data_collector.py"],
-                                capture_output=True, text=True, cwd=".")
-
-        if result.returncode == 0:
-            return {
-                "success": True,
-                "message": "Данные успешно обновлены",
-                "output": result.stdout
-            }
-        else:
-            return {
-                "success": False,
-                "message": "Ошибка при обновлении данных",
-                "error": result.stderr
-            }
+        job = scheduler.trigger()
+        return {
+            "success": True,
+            "message": "Обновление данных запущено",
+            "job_id": job['job_id'],
+            "status": job['status']
+        }
     except Exception as e:
         return {
             "success": False,
-            "message": f"Ошибка выполнения скрипта: {str(e)}"
+            "message": f"Ошибка запуска обновления: {str(e)}"
         }
 
 
+@api_router.get("/update/{job_id}")
+async def get_update_status(job_id: str):
+    """Возвращает статус задания обновления данных."""
+    job = scheduler.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Задание обновления не найдено: {job_id}")
+    return job
+
+
 @api_router.get("/stats")
-async def get_stats():
-    """API endpoint для получения статистики в JSON формате."""
-    try:
-        data_dict = load_and_process_data()
+async def get_stats(
+        data_filter: Optional[DataFilter] = Depends(get_data_filter)):
+    """API endpoint для получения статистики в JSON формате.
+
+    С параметром to возвращаются значения на конец диапазона.
+    """
+    stats = await worker_pool.run(_collect_stats, data_filter)
+    return Response(content=serialize_json(stats),
+                    media_type="application/json")
+
+
+@api_router.get("/stream")
+async def stream_samples(
+        since: Optional[str] = Query(default=None),
+        last_event_id: Optional[str] = Header(default=None)):
+    """Поток событий (Server-Sent Events) с новыми замерами.
+
+    since - время последнего замера, который уже есть у клиента (нс, как
+    в id событий); при переподключении браузер передает его заголовком
+    Last-Event-ID. Замеры новее этого времени отправляются сразу.
+    """
+    since = last_event_id or since
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Некорректное время последнего замера: {since}")
+
+    return StreamingResponse(
+        broadcaster.stream(since),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache',
+                 # Отключает буферизацию ответа в nginx
+                 'X-Accel-Buffering': 'no'})
 
-        stats = {}
-        for username in USERNAMES:
-            if username in data_dict['total'].columns:
-                latest_total = data_dict['total'][username].dropna(
-                ).iloc[-1] if not data_dict['total'][username].dropna().empty else 0
-                latest_progress = data_dict['progress_total'][username].dropna(
-                ).iloc[-1] if not data_dict['progress_total'][username].dropna().empty else 0
 
-                latest_easy = get_latest_value(data_dict['easy'], username)
-                latest_medium = get_latest_value(data_dict['medium'], username)
-                latest_hard = get_latest_value(data_dict['hard'], username)
+def _collect_stats(data_filter):
+    """Собирает статистику по последним значениям пользователей."""
+    from modules.data_processor import load_and_process_data
 
+    try:
+        # Последние значения берутся из индекса хранилища, без просмотра
+        # всей истории каждого пользователя
+        store = load_and_process_data(data_filter).store
+        usernames = USERNAMES
+        if data_filter is not None and data_filter.users is not None:
+            usernames = list(data_filter.users)
+
+        stats = {}
+        for username in usernames:
+            snapshot = store.snapshot(username)
+            if snapshot is not None:
                 user_stats = {
-                    'total_solved': int(latest_total),
-                    'progress_from_start': int(latest_progress),
-                    'easy_solved': int(latest_easy),
-                    'medium_solved': int(latest_medium),
-                    'hard_solved': int(latest_hard)
+                    'total_solved': snapshot['total'],
+                    'progress_from_start': snapshot['progress_total'],
+                    'easy_solved': snapshot['easy'],
+                    'medium_solved': snapshot['medium'],
+                    'hard_solved': snapshot['hard']
                 }
 
                 stats[username] = user_stats
@@ -277,65 +535,118 @@ async def get_stats():
                 }
 
         # Последнее обновление
-        if not data_dict['total'].empty:
-            last_update = data_dict['total'].index[-1].isoformat()
-        else:
-            last_update = None
+        last_timestamp = store.last_timestamp()
+        last_update = (last_timestamp.isoformat()
+                       if last_timestamp is not None else None)
 
         return {
             'stats': stats,
             'last_update': last_update,
-            'total_users': len(USERNAMES),
-            'has_difficulty_data': (not data_dict['easy'].empty or
-                                    not data_dict['medium'].empty or
-                                    not data_dict['hard'].empty)
+            'total_users': len(usernames),
+            'has_difficulty_data': (store.has_values('easy') or
+                                    store.has_values('medium') or
+                                    store.has_values('hard'))
         }
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Ошибка получения статистики: {str(e)}")
 
 
-@plot_router.get("/progress")
-async def get_progress_plot():
-    """Возвращает график прогресса в формате PNG."""
+def _frame_arrays(data_dict, data_key):
+    """Строит таблицу и разбирает ее на массивы для процесса рендеринга."""
+    return frame_to_arrays(data_dict[data_key])
+
+
+async def _image_response(request, chart, data_key, width, height, dpi,
+                          image_format):
+    """Возвращает статический график, используя кэш готовых изображений."""
+    if image_format not in IMAGE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неподдерживаемый формат изображения: {image_format}")
+
+    from modules.data_processor import load_data_with_version
+
     try:
-        data_dict = load_and_process_data()
-        img = create_progress_plot(data_dict['progress_total'])
-        return StreamingResponse(img, media_type="image/png")
+        data_dict, version = await worker_pool.run(load_data_with_version)
+        key = (chart, width, height, dpi, image_format)
+        payload = image_cache.lookup(key, version)
+        if payload is None:
+            # Таблица строится лениво: ее построение и разбор на массивы -
+            # блокирующая работа, она выполняется в пуле потоков
+            arrays = await worker_pool.run(_frame_arrays, data_dict, data_key)
+            body = await image_renderer.render(
+                chart, arrays, width, height, dpi, image_format)
+            payload = image_cache.store(key, version, body)
+        return image_cache.payload_response(
+            request, payload, IMAGE_FORMATS[image_format])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Ошибка создания графика: {str(e)}")
 
 
+@plot_router.get("/progress")
+async def get_progress_plot(
+        request: Request,
+        width: Optional[int] = Query(default=None, ge=100, le=4000),
+        height: Optional[int] = Query(default=None, ge=100, le=4000),
+        dpi: int = Query(default=RENDER_DPI, ge=50, le=600),
+        image_format: str = Query(default="png", alias="format")):
+    """Возвращает график прогресса в формате PNG (или SVG/WEBP).
+
+    width и height задаются в пикселях.
+    """
+    return await _image_response(
+        request, 'progress', 'progress_total', width, height, dpi,
+        image_format)
+
+
 @plot_router.get("/total")
-async def get_total_plot():
+async def get_total_plot(
+        request: Request,
+        width: Optional[int] = Query(default=None, ge=100, le=4000),
+        height: Optional[int] = Query(default=None, ge=100, le=4000),
+        dpi: int = Query(default=RENDER_DPI, ge=50, le=600),
+        image_format: str = Query(default="png", alias="format")):
     """Возвращает график общего количества решенных задач в формате PNG."""
-    try:
-        data_dict = load_and_process_data()
-        img = create_total_plot(data_dict['total'])
-        return StreamingResponse(img, media_type="image/png")
-    except Exception as e:
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка создания графика: {str(e)}")
+    return await _image_response(
+        request, 'total', 'total', width, height, dpi, image_format)
 
 
-@api_router.post("/language")
-async def set_language(language: str = Form(...)):
-    """Устанавливает язык интерфейса."""
+def translations_script_url(translator):
+    """URL скрипта с переводами; меняется при изменении переводов."""
+    return f"/api/translations/{translator.language}/{translator.digest}.js"
+
+
+def _translations_payload(translator, body):
+    """Готовый ответ с переводами; ETag - хэш переводов."""
+    return CachedPayload(
+        translator.digest, body, f'"{translator.digest}"', translator.modified)
+
+
+def _check_language(language):
+    """Проверяет, что язык поддерживается."""
     if language not in i18n.get_supported_languages():
         raise HTTPException(
             status_code=400,
             detail=f"Неподдерживаемый язык: {language}"
         )
 
-    # Создаем Response с переводами
-    response_data = {
-        "status": "success",
-        "language": language,
-        "translations": i18n.get_all_translations(language)
-    }
 
-    response = JSONResponse(content=response_data)
+@api_router.post("/language")
+async def set_language(language: str = Form(...)):
+    """Устанавливает язык интерфейса."""
+    _check_language(language)
+
+    # Создаем Response с переводами (уже сериализованными)
+    translator = i18n.translator(language)
+    response = Response(
+        content=(b'{"status":"success","language":' +
+                 serialize_json(language) +
+                 b',"translations":' + translator.json + b'}'),
+        media_type="application/json")
 
     # Устанавливаем cookie на 365 дней
     response.set_cookie(
@@ -350,15 +661,108 @@ async def set_language(language: str = Form(...)):
 
 
 @api_router.get("/translations/{language}")
-async def get_translations(language: str):
-    """Возвращает переводы для указанного языка."""
-    if language not in i18n.get_supported_languages():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Неподдерживаемый язык: {language}"
-        )
-
-    return JSONResponse(content={
-        "language": language,
-        "translations": i18n.get_all_translations(language)
-    })
+async def get_translations(request: Request, language: str):
+    """Возвращает переводы для указанного языка.
+
+    Ответ проверяется по ETag (хэшу переводов) и не скачивается повторно,
+    пока переводы не изменились.
+    """
+    _check_language(language)
+    translator = i18n.translator(language)
+    return chart_cache.payload_response(
+        request, _translations_payload(translator, translator.bundle))
+
+
+@api_router.get("/translations/{language}/{digest}.js")
+async def get_translations_script(request: Request, language: str,
+                                  digest: str):
+    """Возвращает скрипт, задающий window.translations.
+
+    URL содержит хэш переводов, поэтому ответ кэшируется браузером
+    бессрочно. Если переводы изменились, выполняется перенаправление на
+    актуальный URL.
+    """
+    _check_language(language)
+    translator = i18n.translator(language)
+    if digest != translator.digest:
+        return RedirectResponse(
+            translations_script_url(translator), status_code=307)
+    return chart_cache.payload_response(
+        request, _translations_payload(translator, translator.script),
+        "application/javascript", IMMUTABLE)
+
+
+# Сериализованные шаблоны оформления графиков для языка: digest - хэш
+# шаблонов, translations_digest - хэш переводов, из которых они построены
+ChartTemplates = namedtuple(
+    'ChartTemplates',
+    ['translations_digest', 'digest', 'bundle', 'script', 'modified'])
+
+# Язык -> ChartTemplates (шаблоны строятся один раз для каждой версии
+# переводов)
+_chart_templates = {}
+
+
+def _get_chart_templates(translator):
+    """Возвращает сериализованные шаблоны графиков для языка переводчика."""
+    templates = _chart_templates.get(translator.language)
+    if (templates is None or
+            templates.translations_digest != translator.digest):
+        from modules import chart_creator
+
+        body = serialize_json(chart_creator.chart_templates(translator))
+        templates = ChartTemplates(
+            translator.digest,
+            hashlib.sha256(body).hexdigest()[:16],
+            (b'{"language":' + serialize_json(translator.language) +
+             b',"templates":' + body + b'}'),
+            b'window.chartTemplates=' + body + b';',
+            translator.modified)
+        _chart_templates[translator.language] = templates
+    return templates
+
+
+def chart_templates_script_url(translator):
+    """URL скрипта с шаблонами графиков; меняется при изменении шаблонов."""
+    templates = _get_chart_templates(translator)
+    return (f"/api/chart-templates/{translator.language}/"
+            f"{templates.digest}.js")
+
+
+def _chart_templates_payload(templates, body):
+    """Готовый ответ с шаблонами графиков; ETag - хэш шаблонов."""
+    return CachedPayload(
+        templates.digest, body, f'"{templates.digest}"', templates.modified)
+
+
+@api_router.get("/chart-templates/{language}")
+async def get_chart_templates(request: Request, language: str):
+    """Возвращает шаблоны оформления графиков для указанного языка.
+
+    /api/plot/* и /api/dashboard возвращают только данные графиков с
+    именем шаблона (template); настройки ApexCharts берутся из шаблона.
+    """
+    _check_language(language)
+    templates = _get_chart_templates(i18n.translator(language))
+    return chart_cache.payload_response(
+        request, _chart_templates_payload(templates, templates.bundle))
+
+
+@api_router.get("/chart-templates/{language}/{digest}.js")
+async def get_chart_templates_script(request: Request, language: str,
+                                     digest: str):
+    """Возвращает скрипт, задающий window.chartTemplates.
+
+    URL содержит хэш шаблонов, поэтому ответ кэшируется браузером
+    бессрочно. Если шаблоны изменились, выполняется перенаправление на
+    актуальный URL.
+    """
+    _check_language(language)
+    translator = i18n.translator(language)
+    templates = _get_chart_templates(translator)
+    if digest != templates.digest:
+        return RedirectResponse(
+            chart_templates_script_url(translator), status_code=307)
+    return chart_cache.payload_response(
+        request, _chart_templates_payload(templates, templates.script),
+        "application/javascript", IMMUTABLE)
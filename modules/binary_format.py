@@ -0,0 +1,157 @@
+"""Бинарный колоночный формат данных интерактивных графиков.
+
+Длинные временные ряды в JSON занимают много места и долго разбираются
+браузером. В бинарном формате метаданные графика (шаблон, имена серий,
+аннотации) остаются в JSON-заголовке, а точки рядов передаются
+типизированными массивами, которые app.js читает напрямую в Float64Array.
+
+Формат графика (все числа little-endian):
+    4 байта   - сигнатура b'LCC1'
+    uint32    - длина заголовка (кратна 8, дополняется пробелами)
+    заголовок - данные графика в JSON; у рядов вместо data - columns
+    данные    - массивы рядов, каждый выровнен по 8 байтам
+
+columns ряда: {"length": n, "x": {...}, "y": {...}}, offset массивов -
+от начала блока данных. Время (x, миллисекунды) хранится как start и
+приращения uint32 в единицах unit (1000, если все отметки кратны секунде,
+иначе 1): "type": "u32". Если приращения не помещаются в uint32, время
+хранится целиком: "type": "f64". Значения (y) - "i32", если все они
+целые, иначе "f64".
+
+Формат панели графиков (/api/dashboard):
+    4 байта   - сигнатура b'LCD1'
+    uint32    - длина заголовка (кратна 8)
+    заголовок - {"charts": {имя: {"offset": ..., "length": ...} или
+                {"error": ...}}}
+    данные    - графики в формате выше, каждый выровнен по 8 байтам
+"""
+
+import struct
+from collections import namedtuple
+
+from modules.chart_cache import serialize_json
+
+# Тип содержимого ответа (запрашивается заголовком Accept)
+MEDIA_TYPE = 'application/vnd.leetcode-tracker.columns'
+
+CHART_MAGIC = b'LCC1'
+DASHBOARD_MAGIC = b'LCD1'
+
+# Выравнивание массивов: Float64Array требует смещения, кратного 8
+ALIGNMENT = 8
+
+# Ряд до кодирования: x - время в миллисекундах (int64), y - значения
+# (float64), numpy массивы одной длины. numpy импортируется при
+# кодировании, чтобы не загружать его при запуске приложения
+SeriesColumns = namedtuple('SeriesColumns', ['x', 'y'])
+
+_UINT32_LIMIT = 2 ** 32
+_INT32_LIMIT = 2 ** 31
+
+
+def _padding(length):
+    return -length % ALIGNMENT
+
+
+class _DataBlock:
+    """Блок данных: массивы, выровненные по ALIGNMENT байт."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, raw):
+        """Добавляет байты и возвращает их смещение от начала блока."""
+        offset = self.size
+        self.chunks.append(raw)
+        self.chunks.append(b'\0' * _padding(len(raw)))
+        self.size += len(raw) + _padding(len(raw))
+        return offset
+
+
+def _pack(magic, header, block):
+    """Собирает сигнатуру, выровненный заголовок и блок данных."""
+    header = serialize_json(header)
+    header += b' ' * _padding(len(header))
+    return b''.join(
+        [magic, struct.pack('<I', len(header)), header] + block.chunks)
+
+
+def _encode_x(x, block):
+    """Кодирует время: приращения uint32, если возможно."""
+    import numpy as np
+
+    deltas = np.diff(x)
+    unit = 1000 if not (x % 1000).any() else 1
+    if not len(deltas) or (deltas.min() >= 0 and
+                           deltas.max() // unit < _UINT32_LIMIT):
+        return {
+            'type': 'u32',
+            'start': int(x[0]),
+            'unit': unit,
+            'offset': block.add((deltas // unit).astype('<u4').tobytes())
+        }
+    return {'type': 'f64',
+            'offset': block.add(x.astype('<f8').tobytes())}
+
+
+def _encode_y(y, block):
+    """Кодирует значения: int32, если все они целые."""
+    import numpy as np
+
+    if (np.abs(y) < _INT32_LIMIT).all() and (y == np.trunc(y)).all():
+        return {'type': 'i32',
+                'offset': block.add(y.astype('<i4').tobytes())}
+    return {'type': 'f64',
+            'offset': block.add(y.astype('<f8').tobytes())}
+
+
+def encode_chart(chart_data):
+    """Кодирует данные графика; ряды SeriesColumns становятся массивами.
+
+    Args:
+        chart_data: данные графика из chart_creator (ряды в формате
+            SERIES_FORMAT_BINARY)
+
+    Returns:
+        bytes: график в бинарном формате
+    """
+    import numpy as np
+
+    block = _DataBlock()
+    header = dict(chart_data)
+    series = []
+    for serie in chart_data.get('series', []):
+        data = serie.get('data')
+        if isinstance(data, SeriesColumns) and len(data.x):
+            serie = dict(serie)
+            del serie['data']
+            serie['columns'] = {
+                'length': len(data.x),
+                'x': _encode_x(np.asarray(data.x, dtype=np.int64), block),
+                'y': _encode_y(np.asarray(data.y, dtype=np.float64), block)
+            }
+        elif isinstance(data, SeriesColumns):
+            serie = dict(serie, data=[])
+        series.append(serie)
+    header['series'] = series
+    return _pack(CHART_MAGIC, header, block)
+
+
+def encode_dashboard(charts):
+    """Собирает панель графиков из закодированных графиков.
+
+    Args:
+        charts: список (имя, bytes графика или dict {"error": ...})
+
+    Returns:
+        bytes: панель в бинарном формате
+    """
+    block = _DataBlock()
+    header = {}
+    for name, chart in charts:
+        if isinstance(chart, bytes):
+            header[name] = {'offset': block.add(chart), 'length': len(chart)}
+        else:
+            header[name] = chart
+    return _pack(DASHBOARD_MAGIC, {'charts': header}, block)
@@ -0,0 +1,165 @@
+"""Кэш готовых (сериализованных) конфигураций графиков.
+
+Конфигурация графика меняется только при изменении данных или языка,
+поэтому JSON хранится уже сериализованным и отдается без повторной сборки.
+Ответы сопровождаются ETag и Last-Modified, чтобы браузер мог получить
+304 Not Modified вместо повторной загрузки.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Response
+
+from modules.compression import is_compressible_type
+from config import CHART_CACHE_SIZE, IMAGE_CACHE_SIZE
+
+try:
+    # Необязательная зависимость: сериализация в несколько раз быстрее json
+    import orjson
+except ImportError:
+    orjson = None
+
+# body - сериализованный JSON, etag - значение заголовка ETag,
+# last_modified - время изменения данных (секунды с начала эпохи)
+CachedPayload = namedtuple(
+    'CachedPayload', ['version', 'body', 'etag', 'last_modified'])
+
+# Браузер может хранить ответ, но обязан проверять его актуальность
+REVALIDATE = 'no-cache'
+# Содержимое по этому URL никогда не меняется (в URL есть хэш содержимого)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def serialize_json(content):
+    """Сериализует данные так же, как это делает JSONResponse.
+
+    Если установлен orjson, используется он: результат - тот же JSON
+    (компактный, UTF-8), отличаться может только запись чисел (например,
+    1e16 вместо 1e+16). Данные, которые orjson не поддерживает,
+    сериализуются модулем json.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            pass
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _version_timestamp(version):
+    """Возвращает время изменения данных из версии.
+
+    Версия - отпечатки (inode, размер, mtime) хранилища и файла проверок
+    (None, если файла нет).
+    """
+    return max(signature[2] for signature in version if signature) / 1e9
+
+
+def _not_modified(request, payload):
+    """Проверяет условные заголовки запроса."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # Слабое сравнение: сжатый ответ отдается со слабым ETag (W/"...")
+        tags = [tag.strip().removeprefix('W/')
+                for tag in if_none_match.split(',')]
+        return payload.etag in tags or '*' in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(payload.last_modified) <= since
+    return False
+
+
+class ChartCache:
+    """LRU кэш сериализованных конфигураций графиков."""
+
+    def __init__(self, max_entries=CHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        """Возвращает закэшированный ответ или строит его через build().
+
+        build() возвращает данные для сериализации в JSON или уже готовое
+        тело ответа (bytes).
+        """
+        payload = self.lookup(key, version)
+        if payload is not None:
+            return payload
+
+        body = build()
+        if not isinstance(body, bytes):
+            body = serialize_json(body)
+        return self.store(key, version, body)
+
+    def lookup(self, key, version):
+        """Возвращает закэшированный ответ для версии данных или None."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None and payload.version == version:
+                self._entries.move_to_end(key)
+                return payload
+        return None
+
+    def store(self, key, version, body):
+        """Сохраняет готовое тело ответа в кэш и возвращает CachedPayload."""
+        digest = hashlib.sha1(repr((key, version)).encode('utf-8'))
+        payload = CachedPayload(
+            version, body, f'"{digest.hexdigest()}"',
+            _version_timestamp(version))
+
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    @staticmethod
+    def payload_response(request, payload, media_type="application/json",
+                         cache_control=REVALIDATE, vary=None):
+        """Возвращает ответ для готового CachedPayload или 304 Not Modified.
+
+        vary - заголовки запроса, от которых зависит формат ответа.
+
+        Ответ, который CompressionMiddleware может сжать, зависит и от
+        Accept-Encoding и отдается со слабым ETag: сжатое тело побайтно
+        отличается от исходного. Так 304 несет те же ETag и Vary, что и
+        ответ 200 - сжатый или нет.
+        """
+        etag = payload.etag
+        if is_compressible_type(media_type):
+            etag = 'W/' + etag
+            vary = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        headers = {
+            'ETag': etag,
+            'Last-Modified': formatdate(payload.last_modified, usegmt=True),
+            'Cache-Control': cache_control
+        }
+        if vary:
+            headers['Vary'] = vary
+        if _not_modified(request, payload):
+            return Response(status_code=304, headers=headers)
+        return Response(content=payload.body, media_type=media_type,
+                        headers=headers)
+
+
+# Создаем глобальные экземпляры
+chart_cache = ChartCache()
+# Кэш готовых изображений статических графиков
+image_cache = ChartCache(IMAGE_CACHE_SIZE)
@@ -1,18 +1,178 @@
 """Модуль для создания интерактивных графиков с помощью ApexCharts.js."""
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import io
 from datetime import datetime
-from config import FIGURE_SIZE, PLOT_STYLE, MARKER_SIZE, TITLE_FONT_SIZE, AXIS_FONT_SIZE, LEGEND_FONT_SIZE
+from config import CHART_SERIES_FORMAT
 from modules.i18n import i18n
+from modules.image_renderer import render_figure, frame_to_arrays
+from modules.binary_format import SeriesColumns
 
 # Константы для аннотаций
 ANNOTATION_X_OFFSET_PERCENT = 0.03  # 3% от временного диапазона для смещения аннотации по X
 ANNOTATION_Y_OFFSET_BASE = -15  # Базовое смещение по Y для аннотаций
 ANNOTATION_Y_OFFSET_STEP = 18  # Шаг смещения для избежания пересечений
 
+# Форматы точек временного ряда
+SERIES_FORMAT_PAIRS = 'pairs'  # [[x, y], ...] - поддерживается ApexCharts напрямую
+SERIES_FORMAT_COLUMNS = 'columns'  # {'x': [...], 'y': [...]} - разворачивается в app.js
+SERIES_FORMAT_BINARY = 'binary'  # SeriesColumns для binary_format.encode_chart
+
+# Цвета уровней сложности
+DIFFICULTY_COLORS = {
+    'easy': '#4CAF50',
+    'medium': '#FF9800',
+    'hard': '#F44336'
+}
+
+# Оформление подписей над последними точками линий. Координаты, текст и
+# смещение подписи приходят с данными графика, app.js дополняет их этим
+# оформлением
+USERNAME_ANNOTATION = {
+    'marker': {
+        'size': 0  # Скрываем маркер аннотации
+    },
+    'label': {
+        'offsetX': -10,  # Небольшое дополнительное смещение влево
+        'style': {
+            'background': '#fff',
+            'color': '#333',
+            'fontSize': '12px',
+            'fontWeight': 'bold',
+            'textAnchor': 'middle',
+            'padding': {
+                'left': 5,
+                'right': 5,
+                'top': 2,
+                'bottom': 2
+            },
+            'border': {
+                'color': '#ccc',
+                'width': 1
+            }
+        }
+    }
+}
+
+DIFFICULTY_ANNOTATION = {
+    'marker': {
+        'size': 0  # Скрываем маркер аннотации
+    },
+    'label': {
+        'offsetX': -15,  # Небольшое дополнительное смещение влево
+        'style': {
+            'background': '#333',
+            'color': '#fff',
+            'fontSize': '11px',
+            'fontWeight': 'bold',
+            'textAnchor': 'middle',
+            'padding': {
+                'left': 4,
+                'right': 4,
+                'top': 2,
+                'bottom': 2
+            }
+        }
+    }
+}
+
+
+def lttb_indices(x, y, max_points):
+    """Выбирает точки ряда алгоритмом Largest-Triangle-Three-Buckets.
+
+    Ряд делится на max_points - 2 корзины; из каждой берется точка,
+    образующая треугольник наибольшей площади с предыдущей выбранной точкой
+    и средним следующей корзины. Первая и последняя точки сохраняются всегда.
+
+    Returns:
+        numpy.ndarray: Отсортированные индексы выбранных точек
+    """
+    n = len(x)
+    if max_points is None or max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (max_points - 2)
+    # Границы корзин для внутренних точек (первая и последняя исключены)
+    bounds = (np.arange(max_points - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Среднее следующей корзины (для последней - последняя точка)
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def encode_series(values, series_format=None, max_points=None):
+    """Преобразует временной ряд в точки для ApexCharts без цикла по точкам.
+
+    Args:
+        values: pandas Series с DatetimeIndex (без NaN)
+        series_format: 'pairs', 'columns' или 'binary' (по умолчанию
+            CHART_SERIES_FORMAT)
+        max_points: Если задано, ряд прореживается алгоритмом LTTB до этого
+            числа точек (первая и последняя точки сохраняются)
+
+    Returns:
+        Точки ряда в выбранном формате; x - время в миллисекундах
+    """
+    series_format = series_format or CHART_SERIES_FORMAT
+    # DatetimeIndex хранит наносекунды с начала эпохи
+    x = values.index.asi8 // 1_000_000
+    y = values.to_numpy(dtype=np.float64)
+    if max_points is not None and len(x) > max_points:
+        indices = lttb_indices(x, y, max_points)
+        x, y = x[indices], y[indices]
+    if series_format == SERIES_FORMAT_BINARY:
+        return SeriesColumns(x, y)
+    x = x.tolist()
+    y = y.tolist()
+
+    if series_format == SERIES_FORMAT_COLUMNS:
+        return {'x': x, 'y': y}
+
+    return list(map(list, zip(x, y)))
+
+
+def _series_bounds(data_points):
+    """Возвращает (первый x, последний x, последний y) ряда в любом формате."""
+    if isinstance(data_points, SeriesColumns):
+        if not len(data_points.x):
+            return None
+        return (int(data_points.x[0]), int(data_points.x[-1]),
+                float(data_points.y[-1]))
+    if isinstance(data_points, dict):
+        if not data_points['x']:
+            return None
+        return data_points['x'][0], data_points['x'][-1], data_points['y'][-1]
+    if not data_points:
+        return None
+    return data_points[0][0], data_points[-1][0], data_points[-1][1]
+
+
+def _annotation_x(first_x, last_x):
+    """Смещает подпись назад от последней точки на долю временного диапазона."""
+    if last_x == first_x:
+        return last_x
+    # Вычисляем смещение по X (используем константу для процента от временного диапазона)
+    x_offset = (last_x - first_x) * ANNOTATION_X_OFFSET_PERCENT
+    return last_x - x_offset
+
 
 def _create_username_annotations(df, series):
     """Создает аннотации с именами пользователей над конечными точками линий графика."""
@@ -24,53 +184,26 @@ def _create_username_annotations(df, series):
     
     for i, serie in enumerate(series_to_annotate):
         username = serie['name']
-        data_points = serie['data']
+        bounds = _series_bounds(serie['data'])
         
-        if not data_points:
+        if bounds is None:
             continue
             
         # Берем последнюю точку для размещения подписи, но смещаем по X назад
-        last_point = data_points[-1]
-        
-        # Вычисляем смещение по X (используем константу для процента от временного диапазона)
-        if len(data_points) > 1:
-            time_range = data_points[-1]['x'] - data_points[0]['x']
-            x_offset = time_range * ANNOTATION_X_OFFSET_PERCENT
-            annotation_x = last_point['x'] - x_offset
-        else:
-            annotation_x = last_point['x']
+        first_x, last_x, last_y = bounds
+        annotation_x = _annotation_x(first_x, last_x)
         
         # Динамическое смещение для избежания пересечений
         offset_y = ANNOTATION_Y_OFFSET_BASE - (i * ANNOTATION_Y_OFFSET_STEP)
         
-        # Создаем аннотацию для имени пользователя
+        # Создаем аннотацию для имени пользователя (оформление подписи -
+        # в шаблоне графика, USERNAME_ANNOTATION)
         annotation = {
             'x': annotation_x,
-            'y': last_point['y'],
-            'marker': {
-                'size': 0  # Скрываем маркер аннотации
-            },
+            'y': last_y,
             'label': {
                 'text': username,
-                'offsetY': offset_y,
-                'offsetX': -10,  # Небольшое дополнительное смещение влево
-                'style': {
-                    'background': '#fff',
-                    'color': '#333',
-                    'fontSize': '12px',
-                    'fontWeight': 'bold',
-                    'textAnchor': 'middle',
-                    'padding': {
-                        'left': 5,
-                        'right': 5,
-                        'top': 2,
-                        'bottom': 2
-                    },
-                    'border': {
-                        'color': '#ccc',
-                        'width': 1
-                    }
-                }
+                'offsetY': offset_y
             }
         }
         annotations.append(annotation)
@@ -84,48 +217,28 @@ def _create_difficulty_annotations(series_list):
     
     for i, serie in enumerate(series_list):
         serie_name = serie['name']
-        data_points = serie['data']
+        bounds = _series_bounds(serie['data'])
         
-        if not data_points:
+        if bounds is None:
             continue
             
         # Берем последнюю точку для размещения подписи, но смещаем по X назад
-        last_point = data_points[-1]
-        
-        # Вычисляем смещение по X (используем константу для процента от временного диапазона)
-        if len(data_points) > 1:
-            time_range = data_points[-1]['x'] - data_points[0]['x']
-            x_offset = time_range * ANNOTATION_X_OFFSET_PERCENT
-            annotation_x = last_point['x'] - x_offset
-        else:
-            annotation_x = last_point['x']
+        first_x, last_x, last_y = bounds
+        annotation_x = _annotation_x(first_x, last_x)
         
         # Динамическое смещение для избежания пересечений
         offset_y = ANNOTATION_Y_OFFSET_BASE - (i * ANNOTATION_Y_OFFSET_STEP)
         
-        # Создаем аннотацию для названия серии
+        # Создаем аннотацию для названия серии (оформление подписи - в
+        # шаблоне графика, DIFFICULTY_ANNOTATION; цвет фона - цвет серии)
         annotation = {
             'x': annotation_x,
-            'y': last_point['y'],
-            'marker': {
-                'size': 0  # Скрываем маркер аннотации
-            },
+            'y': last_y,
             'label': {
                 'text': serie_name,
                 'offsetY': offset_y,
-                'offsetX': -15,  # Небольшое дополнительное смещение влево
                 'style': {
-                    'background': serie.get('color', '#333'),
-                    'color': '#fff',
-                    'fontSize': '11px',
-                    'fontWeight': 'bold',
-                    'textAnchor': 'middle',
-                    'padding': {
-                        'left': 4,
-                        'right': 4,
-                        'top': 2,
-                        'bottom': 2
-                    }
+                    'background': serie.get('color', '#333')
                 }
             }
         }
@@ -134,67 +247,49 @@ def _create_difficulty_annotations(series_list):
     return annotations
 
 
-def create_progress_plot_data(df, language="ru"):
-    """Создает конфигурацию для интерактивного графика прогресса с ApexCharts."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
-
-    series = []
-
-    for username in df.columns:
-        # Убираем NaN значения для корректного отображения
-        clean_data = df[username].dropna()
-        if not clean_data.empty:
-            # Подготавливаем данные для ApexCharts
-            data_points = []
-            for timestamp, value in clean_data.items():
-                data_points.append({
-                    # Timestamp в миллисекундах
-                    'x': int(timestamp.timestamp() * 1000),
-                    'y': float(value)
-                })
-
-            series.append({
-                'name': str(username),
-                'data': data_points
-            })
-
-    # Конфигурация для ApexCharts
-    chart_config = {
-        'chart': {
-            'type': 'line',
-            'height': 500,
-            'toolbar': {
-                'show': True
+def _chart_options(chart_type, height, delay, speed=800, dynamic_speed=350):
+    """Настройки chart: тип, высота, панель инструментов и анимации."""
+    return {
+        'type': chart_type,
+        'height': height,
+        'toolbar': {
+            'show': True
+        },
+        'animations': {
+            'enabled': True,
+            'easing': 'easeinout',
+            'speed': speed,
+            'animateGradually': {
+                'enabled': True,
+                'delay': delay
             },
-            'animations': {
+            'dynamicAnimation': {
                 'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 100
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
+                'speed': dynamic_speed
             }
-        },
-        'series': series,
+        }
+    }
+
+
+def _line_chart_template(translator, height, delay, x_title, y_title, title,
+                         marker_size=4, tooltip_format='dd/MM/yyyy HH:mm',
+                         legend=None):
+    """Оформление линейного графика по времени."""
+    return {
+        'chart': _chart_options('line', height, delay),
         'xaxis': {
             'type': 'datetime',
             'title': {
-                'text': i18n.translate('charts.axes.date_time')
+                'text': translator.translate(x_title)
             }
         },
         'yaxis': {
             'title': {
-                'text': i18n.translate('charts.axes.solved_relative')
+                'text': translator.translate(y_title)
             }
         },
         'title': {
-            'text': i18n.translate('charts.progress_title'),
+            'text': translator.translate(title),
             'align': 'center'
         },
         'stroke': {
@@ -202,29 +297,159 @@ def create_progress_plot_data(df, language="ru"):
             'curve': 'smooth'
         },
         'markers': {
-            'size': 4
+            'size': marker_size
         },
         'tooltip': {
             'x': {
-                'format': 'dd/MM/yyyy HH:mm'
+                'format': tooltip_format
             }
         },
-        'legend': {
+        'legend': legend or {
             'position': 'top'
-        },
-        'annotations': {
-            'points': _create_username_annotations(df, series)
         }
     }
 
-    return chart_config
 
+def chart_templates(translator=None):
+    """Возвращает шаблоны оформления интерактивных графиков.
+
+    Шаблон не зависит от данных и меняется только вместе с языком, поэтому
+    он отдается браузеру один раз (см. /api/chart-templates), а
+    /api/plot/* возвращают только данные графика: серии, аннотации и
+    категории. app.js объединяет данные с шаблоном.
+
+    Args:
+        translator: Translator языка подписей (по умолчанию - язык по
+            умолчанию)
+
+    Returns:
+        dict: имя шаблона -> {'options': настройки ApexCharts,
+        'annotation': оформление подписей точек (или None)}
+    """
+    # Переводчик языка запроса
+    translator = translator or i18n.translator()
+
+    # Легенда графиков по сложности: клик по легенде не скрывает серию,
+    # видимостью управляют кнопки уровней сложности
+    difficulty_legend = {
+        'position': 'top',
+        'onItemClick': {
+            'toggleDataSeries': False
+        }
+    }
+
+    return {
+        'progress': {
+            'options': _line_chart_template(
+                translator, 500, 100, 'charts.axes.date_time',
+                'charts.axes.solved_relative', 'charts.progress_title'),
+            'annotation': USERNAME_ANNOTATION
+        },
+        'total': {
+            'options': _line_chart_template(
+                translator, 500, 100, 'charts.axes.date_time',
+                'charts.axes.total_solved', 'charts.total_title'),
+            'annotation': USERNAME_ANNOTATION
+        },
+        'daily-progress': {
+            'options': _line_chart_template(
+                translator, 500, 100, 'charts.axes.date',
+                'charts.axes.total_solved', 'charts.daily_title',
+                marker_size=6, tooltip_format='dd/MM/yyyy'),
+            'annotation': USERNAME_ANNOTATION
+        },
+        'difficulty-total': {
+            'options': _line_chart_template(
+                translator, 600, 120, 'charts.axes.date_time',
+                'charts.axes.total_solved', 'charts.difficulty_total_title',
+                legend=difficulty_legend),
+            'annotation': DIFFICULTY_ANNOTATION
+        },
+        'difficulty-progress': {
+            'options': _line_chart_template(
+                translator, 600, 120, 'charts.axes.date_time',
+                'charts.axes.progress_relative',
+                'charts.difficulty_progress_title',
+                legend=difficulty_legend),
+            'annotation': DIFFICULTY_ANNOTATION
+        },
+        'difficulty-breakdown': {
+            'options': {
+                'chart': dict(_chart_options('bar', 500, 150), stacked=True),
+                'xaxis': {
+                    'title': {
+                        'text': translator.translate('charts.axes.users')
+                    }
+                },
+                'yaxis': {
+                    'title': {
+                        'text': translator.translate('charts.axes.tasks_count')
+                    }
+                },
+                'title': {
+                    'text': translator.translate(
+                        'charts.difficulty_breakdown_title'),
+                    'align': 'center'
+                },
+                'legend': {
+                    'position': 'top'
+                },
+                'plotOptions': {
+                    'bar': {
+                        'horizontal': False
+                    }
+                }
+            },
+            'annotation': None
+        },
+        'weekly-heatmap': {
+            'options': {
+                'chart': _chart_options('heatmap', 400, 200, 1000, 400),
+                'xaxis': {
+                    'title': {
+                        'text': translator.translate('charts.axes.hour_of_day')
+                    }
+                },
+                'yaxis': {
+                    'title': {
+                        'text': translator.translate('charts.axes.day_of_week')
+                    }
+                },
+                'title': {
+                    'text': translator.translate('charts.heatmap_title'),
+                    'align': 'center'
+                },
+                'plotOptions': {
+                    'heatmap': {
+                        'shadeIntensity': 0.5,
+                        'colorScale': {
+                            'ranges': [{
+                                'from': 0,
+                                'to': 5,
+                                'name': 'низкая',
+                                'color': '#FFF3E0'
+                            }, {
+                                'from': 6,
+                                'to': 20,
+                                'name': 'средняя',
+                                'color': '#FF9800'
+                            }, {
+                                'from': 21,
+                                'to': 50,
+                                'name': 'высокая',
+                                'color': '#F57C00'
+                            }]
+                        }
+                    }
+                }
+            },
+            'annotation': None
+        }
+    }
 
-def create_total_plot_data(df, language="ru"):
-    """Создает конфигурацию для интерактивного графика общего количества задач с ApexCharts."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
 
+def _user_series(df, max_points, series_format):
+    """Ряды пользователей (по одному на колонку) без пропусков."""
     series = []
 
     for username in df.columns:
@@ -232,85 +457,78 @@ def create_total_plot_data(df, language="ru"):
         clean_data = df[username].dropna()
         if not clean_data.empty:
             # Подготавливаем данные для ApexCharts
-            data_points = []
-            for timestamp, value in clean_data.items():
-                data_points.append({
-                    # Timestamp в миллисекундах
-                    'x': int(timestamp.timestamp() * 1000),
-                    'y': float(value)
-                })
+            data_points = encode_series(
+                clean_data, series_format, max_points)
 
             series.append({
                 'name': str(username),
                 'data': data_points
             })
 
-    # Конфигурация для ApexCharts
-    chart_config = {
-        'chart': {
-            'type': 'line',
-            'height': 500,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 100
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
-            }
-        },
+    return series
+
+
+def _difficulty_series(difficulty_frames, max_points, series_format):
+    """Ряды пользователей по уровням сложности (Easy, Medium, Hard)."""
+    series = []
+
+    # Добавляем данные для каждого уровня сложности
+    difficulty_data = zip(difficulty_frames, ('Easy', 'Medium', 'Hard'),
+                          DIFFICULTY_COLORS.values())
+
+    for df, level, color in difficulty_data:
+        if not df.empty:
+            for username in df.columns:
+                clean_data = df[username].dropna()
+                if not clean_data.empty:
+                    data_points = encode_series(
+                        clean_data, series_format, max_points)
+
+                    series.append({
+                        'name': f'{username} ({level})',
+                        'data': data_points,
+                        'color': color
+                    })
+
+    return series
+
+
+def create_progress_plot_data(df, max_points=None, series_format=None):
+    """Создает данные для интерактивного графика прогресса с ApexCharts.
+
+    Оформление графика - шаблон 'progress' (см. chart_templates).
+    """
+    series = _user_series(df, max_points, series_format)
+    return {
         'series': series,
-        'xaxis': {
-            'type': 'datetime',
-            'title': {
-                'text': i18n.translate('charts.axes.date_time')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.total_solved')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.total_title'),
-            'align': 'center'
-        },
-        'stroke': {
-            'width': 2,
-            'curve': 'smooth'
-        },
-        'markers': {
-            'size': 4
-        },
-        'tooltip': {
-            'x': {
-                'format': 'dd/MM/yyyy HH:mm'
-            }
-        },
-        'legend': {
-            'position': 'top'
-        },
         'annotations': {
             'points': _create_username_annotations(df, series)
         }
     }
 
-    return chart_config
+
+def create_total_plot_data(df, max_points=None, series_format=None):
+    """Создает данные для интерактивного графика общего количества задач.
+
+    Оформление графика - шаблон 'total' (см. chart_templates).
+    """
+    series = _user_series(df, max_points, series_format)
+    return {
+        'series': series,
+        'annotations': {
+            'points': _create_username_annotations(df, series)
+        }
+    }
 
 
 def create_difficulty_breakdown_data(
-        df_easy, df_medium, df_hard, language="ru"):
-    """Создает конфигурацию для интерактивного графика распределения задач по уровням сложности."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
+        df_easy, df_medium, df_hard, translator=None):
+    """Создает данные для графика распределения задач по уровням сложности.
+
+    Оформление графика - шаблон 'difficulty-breakdown' (см. chart_templates).
+    """
+    # Переводчик языка запроса (названия серий)
+    translator = translator or i18n.translator()
 
     categories = []
     easy_data = []
@@ -333,406 +551,146 @@ def create_difficulty_breakdown_data(
             medium_data.append(float(latest_medium))
             hard_data.append(float(latest_hard))
 
-    # Конфигурация для ApexCharts
-    chart_config = {
-        'chart': {
-            'type': 'bar',
-            'height': 500,
-            'stacked': True,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 150
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
-            }
-        },
+    return {
         'series': [
             {
-                'name': i18n.translate('charts.series_labels.easy'),
+                'name': translator.translate('charts.series_labels.easy'),
                 'data': easy_data,
-                'color': '#4CAF50'
+                'color': DIFFICULTY_COLORS['easy']
             },
             {
-                'name': i18n.translate('charts.series_labels.medium'),
+                'name': translator.translate('charts.series_labels.medium'),
                 'data': medium_data,
-                'color': '#FF9800'
+                'color': DIFFICULTY_COLORS['medium']
             },
             {
-                'name': i18n.translate('charts.series_labels.hard'),
+                'name': translator.translate('charts.series_labels.hard'),
                 'data': hard_data,
-                'color': '#F44336'
+                'color': DIFFICULTY_COLORS['hard']
             }
         ],
         'xaxis': {
-            'categories': categories,
-            'title': {
-                'text': i18n.translate('charts.axes.users')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.tasks_count')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.difficulty_breakdown_title'),
-            'align': 'center'
-        },
-        'legend': {
-            'position': 'top'
-        },
-        'plotOptions': {
-            'bar': {
-                'horizontal': False
-            }
+            'categories': categories
         }
     }
 
-    return chart_config
 
+def create_daily_progress_data(data_dict, max_points=None,
+                               series_format=None):
+    """Создает данные для графика прогресса с группировкой по дням.
 
-def create_daily_progress_data(data_dict, language="ru"):
-    """Создает конфигурацию для графика прогресса с группировкой по дням."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
-
+    Оформление графика - шаблон 'daily-progress' (см. chart_templates).
+    """
     df_total = data_dict['total']
 
     if df_total.empty:
-        return {'series': [], 'chart': {'type': 'line'}}
-
-    # Группируем по дням
-    df_daily = df_total.groupby(df_total.index.date).last()
-    df_daily.index = pd.to_datetime(df_daily.index)
+        return {'series': []}
 
-    series = []
-
-    for username in df_daily.columns:
-        clean_data = df_daily[username].dropna()
-        if not clean_data.empty:
-            data_points = []
-            for timestamp, value in clean_data.items():
-                data_points.append({
-                    'x': int(timestamp.timestamp() * 1000),
-                    'y': float(value)
-                })
-
-            series.append({
-                'name': str(username),
-                'data': data_points
-            })
+    # Группируем по дням (если данные уже агрегированы по дням, группировка
+    # ничего не меняет)
+    df_daily = df_total.groupby(df_total.index.normalize()).last()
 
-    chart_config = {
-        'chart': {
-            'type': 'line',
-            'height': 500,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 100
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
-            }
-        },
+    series = _user_series(df_daily, max_points, series_format)
+    return {
         'series': series,
-        'xaxis': {
-            'type': 'datetime',
-            'title': {
-                'text': i18n.translate('charts.axes.date')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.total_solved')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.daily_title'),
-            'align': 'center'
-        },
-        'stroke': {
-            'width': 2,
-            'curve': 'smooth'
-        },
-        'markers': {
-            'size': 6
-        },
-        'tooltip': {
-            'x': {
-                'format': 'dd/MM/yyyy'
-            }
-        },
-        'legend': {
-            'position': 'top'
-        },
         'annotations': {
             'points': _create_username_annotations(df_daily, series)
         }
     }
 
-    return chart_config
-
-
-def create_difficulty_total_data(df_easy, df_medium, df_hard, language="ru"):
-    """Создает конфигурацию для графика общего количества задач по каждому уровню сложности."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
-
-    series = []
-
-    colors = {
-        'easy': '#4CAF50',
-        'medium': '#FF9800',
-        'hard': '#F44336'
-    }
-
-    # Добавляем данные для каждого уровня сложности
-    difficulty_data = [
-        (df_easy, 'Easy', colors['easy']),
-        (df_medium, 'Medium', colors['medium']),
-        (df_hard, 'Hard', colors['hard'])
-    ]
-
-    for df, level, color in difficulty_data:
-        if not df.empty:
-            for username in df.columns:
-                clean_data = df[username].dropna()
-                if not clean_data.empty:
-                    data_points = []
-                    for timestamp, value in clean_data.items():
-                        data_points.append({
-                            'x': int(timestamp.timestamp() * 1000),
-                            'y': float(value)
-                        })
 
-                    series.append({
-                        'name': f'{username} ({level})',
-                        'data': data_points,
-                        'color': color
-                    })
+def create_difficulty_total_data(df_easy, df_medium, df_hard,
+                                 max_points=None, series_format=None):
+    """Создает данные для графика общего количества задач по уровням сложности.
 
-    chart_config = {
-        'chart': {
-            'type': 'line',
-            'height': 600,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 120
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
-            }
-        },
+    Оформление графика - шаблон 'difficulty-total' (см. chart_templates).
+    """
+    series = _difficulty_series(
+        (df_easy, df_medium, df_hard), max_points, series_format)
+    return {
         'series': series,
-        'xaxis': {
-            'type': 'datetime',
-            'title': {
-                'text': i18n.translate('charts.axes.date_time')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.total_solved')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.difficulty_total_title'),
-            'align': 'center'
-        },
-        'stroke': {
-            'width': 2,
-            'curve': 'smooth'
-        },
-        'markers': {
-            'size': 4
-        },
-        'tooltip': {
-            'x': {
-                'format': 'dd/MM/yyyy HH:mm'
-            }
-        },
-        'legend': {
-            'position': 'top',
-            'onItemClick': {
-                'toggleDataSeries': False
-            }
-        },
         'annotations': {
             'points': _create_difficulty_annotations(series)
         }
     }
 
-    return chart_config
-
 
 def create_difficulty_progress_data(
-        df_progress_easy, df_progress_medium, df_progress_hard, language="ru"):
-    """Создает конфигурацию для графика прогресса по каждому уровню сложности."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
-
-    series = []
-
-    colors = {
-        'easy': '#4CAF50',
-        'medium': '#FF9800',
-        'hard': '#F44336'
-    }
-
-    # Добавляем данные для каждого уровня сложности
-    difficulty_data = [
-        (df_progress_easy, 'Easy', colors['easy']),
-        (df_progress_medium, 'Medium', colors['medium']),
-        (df_progress_hard, 'Hard', colors['hard'])
-    ]
-
-    for df, level, color in difficulty_data:
-        if not df.empty:
-            for username in df.columns:
-                clean_data = df[username].dropna()
-                if not clean_data.empty:
-                    data_points = []
-                    for timestamp, value in clean_data.items():
-                        data_points.append({
-                            'x': int(timestamp.timestamp() * 1000),
-                            'y': float(value)
-                        })
-
-                    series.append({
-                        'name': f'{username} ({level})',
-                        'data': data_points,
-                        'color': color
-                    })
-
-    chart_config = {
-        'chart': {
-            'type': 'line',
-            'height': 600,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 800,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 120
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 350
-                }
-            }
-        },
+        df_progress_easy, df_progress_medium, df_progress_hard,
+        max_points=None, series_format=None):
+    """Создает данные для графика прогресса по каждому уровню сложности.
+
+    Оформление графика - шаблон 'difficulty-progress' (см. chart_templates).
+    """
+    series = _difficulty_series(
+        (df_progress_easy, df_progress_medium, df_progress_hard), max_points,
+        series_format)
+    return {
         'series': series,
-        'xaxis': {
-            'type': 'datetime',
-            'title': {
-                'text': i18n.translate('charts.axes.date_time')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.progress_relative')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.difficulty_progress_title'),
-            'align': 'center'
-        },
-        'stroke': {
-            'width': 2,
-            'curve': 'smooth'
-        },
-        'markers': {
-            'size': 4
-        },
-        'tooltip': {
-            'x': {
-                'format': 'dd/MM/yyyy HH:mm'
-            }
-        },
-        'legend': {
-            'position': 'top',
-            'onItemClick': {
-                'toggleDataSeries': False
-            }
-        },
         'annotations': {
             'points': _create_difficulty_annotations(series)
         }
     }
 
-    return chart_config
 
+def weekly_activity(df, per_user=False):
+    """Суммирует активность по дням недели и часам.
 
-def create_weekly_heatmap_data(data_dict, language="ru"):
-    """Создает конфигурацию для тепловой карты активности по дням недели и часам."""
-    # Устанавливаем язык для переводов
-    i18n.set_language(language)
+    Активность - положительный прирост значения между соседними замерами
+    пользователя (пропуски не учитываются). Прирост относится к дню недели
+    и часу более позднего замера. Все вычисления выполняются над массивами
+    целиком: ячейка (день, час) вычисляется из времени замера, а суммы
+    получаются одним вызовом numpy.bincount.
 
-    df_total = data_dict['total']
+    Args:
+        df: широкая таблица (время x пользователи)
+        per_user: вернуть отдельную матрицу для каждого пользователя
 
-    if df_total.empty:
-        return {'series': [], 'chart': {'type': 'heatmap'}}
+    Returns:
+        numpy.ndarray: матрица 7x24 (понедельник - 0) или, при per_user,
+        массив формы [пользователь, 7, 24] в порядке колонок df
+    """
+    users = len(df.columns)
+    if df.empty:
+        shape = (users, 7, 24) if per_user else (7, 24)
+        return np.zeros(shape)
+
+    values = df.to_numpy(dtype=np.float64)
+    # Предыдущее известное значение для каждой строки: протягиваем
+    # последнее значение вперед и сдвигаем на одну строку
+    previous = pd.DataFrame(values).ffill().shift().to_numpy()
+    activity = values - previous
+    rows, columns = np.nonzero(activity > 0)
 
-    # Создаем DataFrame для всех пользователей с временными метками
-    activity_data = []
+    # Время хранится в наносекундах; 1 января 1970 года - четверг
+    hours = df.index.asi8[rows] // 3_600_000_000_000
+    cells = (hours // 24 + 3) % 7 * 24 + hours % 24
+    weights = activity[rows, columns]
 
-    for username in df_total.columns:
-        user_data = df_total[username].dropna()
-        if not user_data.empty:
-            # Вычисляем разности (активность)
-            activity = user_data.diff().fillna(0)
-            activity = activity[activity > 0]  # Только положительные изменения
+    if per_user:
+        counts = np.bincount(
+            columns * 168 + cells, weights=weights, minlength=users * 168)
+        return counts.reshape(users, 7, 24)
+    return np.bincount(cells, weights=weights, minlength=168).reshape(7, 24)
 
-            for timestamp, value in activity.items():
-                activity_data.append({
-                    'username': username,
-                    'timestamp': timestamp,
-                    'activity': value,
-                    'hour': timestamp.hour,
-                    'day_of_week': timestamp.strftime('%A'),
-                    'weekday': timestamp.weekday()
-                })
 
-    if not activity_data:
-        return {'series': [], 'chart': {'type': 'heatmap'}}
+def create_weekly_heatmap_data(data_dict, metric='total'):
+    """Создает данные для тепловой карты активности по дням недели и часам.
 
-    activity_df = pd.DataFrame(activity_data)
+    Оформление графика - шаблон 'weekly-heatmap' (см. chart_templates).
 
-    # Группируем по дням недели и часам
-    heatmap_data = activity_df.groupby(['day_of_week', 'weekday', 'hour'])[
-        'activity'].sum().reset_index()
+    Args:
+        data_dict: словарь DataFrame из load_and_process_data
+        metric: 'total' или уровень сложности ('easy', 'medium', 'hard')
+    """
+    df = data_dict[metric]
+
+    if df.empty:
+        return {'series': []}
+
+    heatmap = weekly_activity(df)
+    if not heatmap.any():
+        return {'series': []}
 
     # Создаем серии данных для тепловой карты
     days_order = [
@@ -745,160 +703,24 @@ def create_weekly_heatmap_data(data_dict, language="ru"):
         'Sunday']
     series = []
 
-    for day in days_order:
-        day_data = []
-        for hour in range(24):
-            activity = heatmap_data[
-                (heatmap_data['day_of_week'] == day) &
-                (heatmap_data['hour'] == hour)
-            ]['activity'].sum()
-            day_data.append({
-                'x': f'{hour}:00',
-                'y': float(activity)
-            })
-
+    for day, activity in zip(days_order, heatmap.tolist()):
         series.append({
             'name': day,
-            'data': day_data
+            'data': [{'x': f'{hour}:00', 'y': value}
+                     for hour, value in enumerate(activity)]
         })
 
-    chart_config = {
-        'chart': {
-            'type': 'heatmap',
-            'height': 400,
-            'toolbar': {
-                'show': True
-            },
-            'animations': {
-                'enabled': True,
-                'easing': 'easeinout',
-                'speed': 1000,
-                'animateGradually': {
-                    'enabled': True,
-                    'delay': 200
-                },
-                'dynamicAnimation': {
-                    'enabled': True,
-                    'speed': 400
-                }
-            }
-        },
-        'series': series,
-        'xaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.hour_of_day')
-            }
-        },
-        'yaxis': {
-            'title': {
-                'text': i18n.translate('charts.axes.day_of_week')
-            }
-        },
-        'title': {
-            'text': i18n.translate('charts.heatmap_title'),
-            'align': 'center'
-        },
-        'plotOptions': {
-            'heatmap': {
-                'shadeIntensity': 0.5,
-                'colorScale': {
-                    'ranges': [{
-                        'from': 0,
-                        'to': 5,
-                        'name': 'низкая',
-                        'color': '#FFF3E0'
-                    }, {
-                        'from': 6,
-                        'to': 20,
-                        'name': 'средняя',
-                        'color': '#FF9800'
-                    }, {
-                        'from': 21,
-                        'to': 50,
-                        'name': 'высокая',
-                        'color': '#F57C00'
-                    }]
-                }
-            }
-        }
-    }
+    return {'series': series}
 
-    return chart_config
 
+def create_progress_plot(df, **options):
+    """Создает график прогресса и возвращает его в виде байтов.
 
-def create_progress_plot(df):
-    """Создает график прогресса и возвращает его в виде байтов."""
-    plt.style.use(PLOT_STYLE)
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    options передаются в render_figure (width, height, dpi, image_format).
+    """
+    return io.BytesIO(render_figure('progress', *frame_to_arrays(df), **options))
 
-    for username in df.columns:
-        ax.plot(
-            df.index,
-            df[username],
-            marker='o',
-            linestyle='-',
-            markersize=MARKER_SIZE,
-            label=username)
-
-    ax.set_title(
-        'Прогресс на LeetCode (с начала отслеживания)',
-        fontsize=TITLE_FONT_SIZE,
-        pad=20)
-    ax.set_xlabel('Дата и время', fontsize=AXIS_FONT_SIZE)
-    ax.set_ylabel(
-        'Решено задач (относительно старта)',
-        fontsize=AXIS_FONT_SIZE)
-    ax.legend(title='Участники', fontsize=LEGEND_FONT_SIZE)
-    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
-
-    # Улучшенное форматирование оси X
-    fig.autofmt_xdate(rotation=30, ha='right')
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-
-    plt.tight_layout()
-
-    # Сохраняем график в BytesIO
-    img = io.BytesIO()
-    plt.savefig(img, format='png', dpi=150)
-    img.seek(0)
-    plt.close()  # Важно закрыть фигуру для освобождения памяти
-
-    return img
-
-
-def create_total_plot(df):
-    """Создает график общего количества решенных задач."""
-    plt.style.use(PLOT_STYLE)
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
 
-    for username in df.columns:
-        ax.plot(
-            df.index,
-            df[username],
-            marker='o',
-            linestyle='-',
-            markersize=MARKER_SIZE,
-            label=username)
-
-    ax.set_title(
-        'Общее количество решенных задач на LeetCode',
-        fontsize=TITLE_FONT_SIZE,
-        pad=20)
-    ax.set_xlabel('Дата и время', fontsize=AXIS_FONT_SIZE)
-    ax.set_ylabel('Общее количество решенных задач', fontsize=AXIS_FONT_SIZE)
-    ax.legend(title='Участники', fontsize=LEGEND_FONT_SIZE)
-    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
-
-    # Улучшенное форматирование оси X
-    fig.autofmt_xdate(rotation=30, ha='right')
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-
-    plt.tight_layout()
-
-    # Сохраняем график в BytesIO
-    img = io.BytesIO()
-    plt.savefig(img, format='png', dpi=150)
-    img.seek(0)
-    plt.close()
-
-    return img
+def create_total_plot(df, **options):
+    """Создает график общего количества решенных задач."""
+    return io.BytesIO(render_figure('total', *frame_to_arrays(df), **options))
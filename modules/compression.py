@@ -0,0 +1,187 @@
+"""Сжатие ответов (brotli или gzip) по заголовку Accept-Encoding.
+
+Сжимаются только ответы, отданные целиком (потоковые ответы, например
+события сервера, передаются как есть), текстовых и JSON типов, не меньше
+COMPRESSION_MIN_SIZE байт. Готовые ответы графиков сопровождаются ETag и
+не меняются, пока не изменятся данные, поэтому сжатое тело запоминается
+по ETag и повторно не сжимается.
+
+brotli - необязательная зависимость: если пакет не установлен,
+используется только gzip.
+"""
+
+import gzip
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import COMPRESSION_MIN_SIZE, COMPRESSION_CACHE_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Уровни сжатия: баланс между размером и временем сжатия
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Тела больше этого размера сжимаются в пуле потоков, чтобы не
+# блокировать цикл событий
+THREADPOOL_MIN_SIZE = 256 * 1024
+
+# Типы содержимого, которые имеет смысл сжимать
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/vnd.leetcode-tracker.columns',  # binary_format.MEDIA_TYPE
+    'image/svg+xml',
+    'text/',
+)
+
+
+def _accepted_encodings(accept_encoding):
+    """Разбирает Accept-Encoding в словарь кодировка -> q."""
+    encodings = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """Выбирает кодировку ответа: br (если доступен), затем gzip или None."""
+    encodings = _accepted_encodings(accept_encoding or '')
+    wildcard = encodings.get('*', 0.0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    for name in candidates:
+        if encodings.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def compress(body, encoding):
+    """Сжимает тело ответа выбранной кодировкой."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 - одинаковое тело сжимается в одинаковые байты
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def is_compressible_type(content_type):
+    """Проверяет, может ли ответ такого типа быть сжат."""
+    return (content_type or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def _is_compressible(headers):
+    """Проверяет тип содержимого и отсутствие другого сжатия."""
+    if 'content-encoding' in headers:
+        return False
+    return is_compressible_type(headers.get('content-type'))
+
+
+def _add_vary(headers, name):
+    """Добавляет заголовок в Vary, если его там еще нет."""
+    listed = [item.strip().lower()
+              for item in headers.get('vary', '').split(',')]
+    if name.lower() not in listed:
+        headers.add_vary_header(name)
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов.
+
+    Args:
+        app: ASGI приложение
+        minimum_size: минимальный размер тела для сжатия (байты)
+        cache_size: сколько сжатых тел хранить (по ETag и кодировке)
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE,
+                 cache_size=COMPRESSION_CACHE_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_size = cache_size
+        # Выполняется только в цикле событий, блокировка не нужна
+        self._cache = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Начало ответа задерживается до первой части тела: только тогда
+        # известно, можно ли его сжать
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if (message['type'] != 'http.response.body' or
+                    start_message is None):
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            body = message.get('body', b'')
+            if not _is_compressible(headers):
+                await send(start)
+                await send(message)
+                return
+
+            _add_vary(headers, 'Accept-Encoding')
+            if (message.get('more_body', False) or
+                    len(body) < self.minimum_size):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = await self._compress(body, encoding,
+                                              headers.get('etag'))
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(compressed))
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                # Сжатое представление отличается побайтно от исходного
+                headers['ETag'] = 'W/' + etag
+            await send(start)
+            await send({'type': 'http.response.body', 'body': compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(self, body, encoding, etag):
+        """Сжимает тело или берет сжатое тело из кэша по ETag."""
+        key = (etag, encoding, len(body)) if etag else None
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if len(body) >= THREADPOOL_MIN_SIZE:
+            compressed = await run_in_threadpool(compress, body, encoding)
+        else:
+            compressed = compress(body, encoding)
+
+        if key is not None and self.cache_size > 0:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
@@ -1,96 +1,179 @@
 """Модуль для загрузки и обработки данных LeetCode."""
 
-import pandas as pd
-import os
+import threading
 from fastapi import HTTPException
-from config import CSV_FILE
+from modules.storage import get_storage, Heartbeat
+from modules.progress_store import ProgressStore, StoreFrames
 
+class IncrementalLoader:
+    """Инкрементальный загрузчик данных из хранилища.
 
-def load_and_process_data():
-    """Загружает данные, преобразует их и вычисляет прогресс."""
-    if not os.path.exists(CSV_FILE):
-        raise HTTPException(
-            status_code=404,
-            detail="Файл с данными не найден. Запустите скрипт обновления данных.")
+    Хранилище только дописывается сборщиком, поэтому загрузчик запоминает
+    позицию, до которой данные уже прочитаны, и при следующем вызове
+    получает только новые записи, вливая их в компактное хранилище в
+    памяти (ProgressStore). Если хранилище было перезаписано, выполняется
+    полная загрузка.
 
-    try:
-        # Загружаем все данные
-        df = pd.read_csv(CSV_FILE)
-        if df.empty:
-            raise HTTPException(status_code=404, detail="Файл с данными пуст.")
+    Проверки без изменений, не записанные в историю (см. Heartbeat),
+    добавляются к результату как последние замеры пользователей.
+    """
+
+    def __init__(self, storage, heartbeat=None):
+        self.storage = storage
+        self.heartbeat = heartbeat
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает состояние, следующая загрузка будет полной."""
+        self.signature = None
+        self.cursor = None
+        # История, построенная только по завершенным записям
+        self.store = ProgressStore()
+        # История с учетом последней незавершенной записи, если она есть
+        self.current = None
+        # Версия данных (отпечатки хранилища и файла проверок, по которым
+        # построен результат)
+        self.version = None
+
+    def invalidate(self):
+        """Требует повторной проверки хранилища при следующей загрузке."""
+        self.signature = None
+
+    def load(self):
+        """Возвращает актуальную историю замеров (ProgressStore)."""
+        signature = (self.storage.signature(),
+                     self.heartbeat.signature() if self.heartbeat else None)
+        if signature == self.signature and self.current is not None:
+            return self.current
+
+        result = self.storage.read(self.cursor)
+        if result.full:
+            self.reset()
+
+        self.store = self.store.merge(result.frame)
+        self.cursor = result.cursor
 
-        # Преобразуем строку с timestamp в объект datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-        # Преобразуем в широкий формат для каждого типа метрик, если колонки
-        # есть, иначе пустые DataFrame
-        df_total = df.pivot_table(
-            index='timestamp',
-            columns='username',
-            values='total_solved')
-        df_easy = df.pivot_table(
-            index='timestamp',
-            columns='username',
-            values='easy_solved') if 'easy_solved' in df.columns else pd.DataFrame()
-        df_medium = df.pivot_table(
-            index='timestamp',
-            columns='username',
-            values='medium_solved') if 'medium_solved' in df.columns else pd.DataFrame()
-        df_hard = df.pivot_table(
-            index='timestamp',
-            columns='username',
-            values='hard_solved') if 'hard_solved' in df.columns else pd.DataFrame()
-
-        if df_total.empty:
+        # Незавершенная запись и незаписанные проверки учитываются в
+        # результате, но не в сохраненном состоянии: при следующем чтении
+        # они будут прочитаны заново. Агрегаты по интервалам при этом
+        # хранятся в self.store и только дополняются этими строками
+        self.current = self.store.overlay(result.pending)
+        if self.heartbeat is not None:
+            self.current = self.current.overlay(self.heartbeat.frame())
+
+        if not len(self.current):
+            self.reset()
+            raise HTTPException(status_code=404, detail="Файл с данными пуст.")
+        if not self.current.has_values('total'):
+            self.reset()
             raise HTTPException(
                 status_code=404,
                 detail="Нет данных для обработки.")
 
-        # Вычисляем прогресс относительно первого замера для каждого
-        # пользователя
-        def calculate_progress(col):
-            if col.dropna().empty:
-                return col
-            first_value = col.loc[col.first_valid_index()]
-            return (col - first_value).astype('float64')
-
-        df_progress_total = df_total.apply(calculate_progress, axis=0)
-
-        # Прогресс для каждого уровня сложности
-        df_progress_easy = df_easy.apply(
-            calculate_progress,
-            axis=0) if not df_easy.empty else pd.DataFrame()
-        df_progress_medium = df_medium.apply(
-            calculate_progress,
-            axis=0) if not df_medium.empty else pd.DataFrame()
-        df_progress_hard = df_hard.apply(
-            calculate_progress,
-            axis=0) if not df_hard.empty else pd.DataFrame()
-
-        # Приводим все к float64
-        df_total = df_total.astype('float64')
-        if not df_easy.empty:
-            df_easy = df_easy.astype('float64')
-        if not df_medium.empty:
-            df_medium = df_medium.astype('float64')
-        if not df_hard.empty:
-            df_hard = df_hard.astype('float64')
-
-        return {
-            'progress_total': df_progress_total,
-            'total': df_total,
-            'easy': df_easy,
-            'medium': df_medium,
-            'hard': df_hard,
-            'progress_easy': df_progress_easy,
-            'progress_medium': df_progress_medium,
-            'progress_hard': df_progress_hard
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Ошибка при обработке данных: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500,
-                            detail=f"Ошибка обработки данных: {str(e)}")
+        self.signature = signature
+        self.version = signature
+        return self.current
+
+
+# Кэш обработанных данных на уровень процесса. Ключ - отпечатки хранилища
+# и файла проверок (inode, размер, mtime), поэтому пока файлы не меняются,
+# повторного парсинга нет, а новые строки разбираются инкрементально.
+_cache_lock = threading.Lock()
+_storage = get_storage()
+_loader = IncrementalLoader(_storage, Heartbeat())
+
+
+def invalidate_cache():
+    """Помечает кэш устаревшим (например, после обновления).
+
+    Следующая загрузка заново проверит хранилище; уже прочитанные данные
+    сохраняются, и новые записи будут дочитаны инкрементально.
+    """
+    with _cache_lock:
+        _loader.invalidate()
+
+
+def filter_data(data, data_filter):
+    """Применяет фильтр к обработанным данным.
+
+    Прогресс остается посчитанным относительно первого замера за всю историю.
+
+    Args:
+        data: StoreFrames, возвращаемый load_and_process_data
+        data_filter: DataFilter или None
+
+    Returns:
+        StoreFrames: Данные той же структуры
+    """
+    if data_filter is None:
+        return data
+    return StoreFrames(data.store.select(
+        data_filter.start, data_filter.end, data_filter.users))
+
+
+def select_data(store, data_filter=None, resolution=None):
+    """Возвращает данные из истории с учетом интервала агрегации и фильтра.
+
+    Args:
+        store: ProgressStore со всей историей
+        data_filter: DataFilter или None
+        resolution: интервал агрегации из RESOLUTIONS или None (замеры)
+
+    Returns:
+        StoreFrames: словарь DataFrame; при resolution строки таблиц -
+        начала интервалов, значения - последние за интервал
+    """
+    if resolution is not None:
+        store = store.rollup(resolution).store
+    return filter_data(StoreFrames(store), data_filter)
+
+
+def load_and_process_data(data_filter=None, resolution=None):
+    """Загружает данные, преобразует их и вычисляет прогресс.
+
+    Returns:
+        StoreFrames: словарь DataFrame (total, easy, medium, hard и
+        progress_*), таблицы строятся при первом обращении
+    """
+    return load_data_with_version(data_filter, resolution)[0]
+
+
+def load_data_with_version(data_filter=None, resolution=None):
+    """Загружает данные и возвращает их вместе с версией.
+
+    Версия меняется при каждом изменении хранилища и используется как ключ
+    кэшей, построенных на основе данных.
+
+    Args:
+        data_filter: DataFilter для выбора диапазона времени и пользователей
+        resolution: интервал агрегации из RESOLUTIONS или None (замеры)
+
+    Returns:
+        tuple: (словарь DataFrame, версия данных)
+    """
+    store, version = load_store_with_version()
+    return select_data(store, data_filter, resolution), version
+
+
+def load_store_with_version():
+    """Загружает всю историю замеров (ProgressStore) и ее версию."""
+    if not _storage.exists():
+        raise HTTPException(
+            status_code=404,
+            detail="Файл с данными не найден. Запустите скрипт обновления данных.")
+
+    with _cache_lock:
+        try:
+            store = _loader.load()
+            version = _loader.version
+        except HTTPException:
+            _loader.reset()
+            raise
+        except Exception as e:
+            _loader.reset()
+            print(f"Ошибка при обработке данных: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500,
+                                detail=f"Ошибка обработки данных: {str(e)}")
+    return store, version
@@ -0,0 +1,77 @@
+"""Межпроцессная блокировка файлов хранилища.
+
+Блокировка берется на отдельный файл ``<путь>.lock``, поэтому она
+сохраняется при атомарной замене самого файла данных. Запись выполняется
+под исключительной блокировкой, чтение - под разделяемой, так что
+несколько сборщиков и веб-процессов могут работать с одним каталогом
+данных одновременно. Повторный захват той же блокировки тем же потоком
+ничего не делает, что позволяет вкладывать операции (например, чтение и
+перезапись при сжатии).
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Блокировки, удерживаемые текущим потоком: путь -> shared
+_held = threading.local()
+
+
+def _acquire(f, shared):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return
+    # msvcrt не поддерживает разделяемые блокировки; LK_LOCK ждет около
+    # 10 секунд и выбрасывает OSError, поэтому повторяем попытки
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _release(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Блокирует path на время выполнения блока with.
+
+    Args:
+        path: путь к файлу или каталогу данных
+        shared: разделяемая блокировка (для чтения)
+    """
+    held = getattr(_held, 'paths', None)
+    if held is None:
+        held = _held.paths = {}
+
+    key = os.path.abspath(path)
+    if key in held:
+        if held[key] and not shared:
+            raise RuntimeError(
+                f"Нельзя повысить разделяемую блокировку {path} до "
+                f"исключительной")
+        yield
+        return
+
+    with open(key + '.lock', 'a+b') as f:
+        _acquire(f, shared)
+        held[key] = shared
+        try:
+            yield
+        finally:
+            del held[key]
+            _release(f)
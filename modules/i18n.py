@@ -1,69 +1,191 @@
-"""Утилита для интернационализации."""
+"""Утилита для интернационализации.
 
+Переводы каждого языка представлены неизменяемым объектом Translator.
+Обработчик запроса получает переводчик для языка запроса и передает его
+дальше (например, в функции chart_creator), поэтому запросы на разных
+языках не влияют друг на друга и могут выполняться параллельно.
+
+Переводы сериализуются один раз при загрузке; хэш содержимого (digest)
+входит в URL пакета переводов, поэтому браузер может кэшировать его
+бессрочно. При разработке каталог переводов можно отслеживать и
+перезагружать переводы без перезапуска (I18N_RELOAD_INTERVAL).
+"""
+
+import hashlib
 import json
 import os
+import threading
+from types import MappingProxyType
 from typing import Dict, Any
 
+from config import I18N_RELOAD_INTERVAL
+
+# Язык по умолчанию (и для неподдерживаемых языков)
+DEFAULT_LANGUAGE = "ru"
+
+
+def _flatten(translations, prefix="", flat=None):
+    """Строит словарь "section.subsection.key" -> значение.
+
+    В словарь попадают и листья, и промежуточные разделы, как при обходе
+    вложенных словарей по частям ключа.
+    """
+    if flat is None:
+        flat = {}
+    for key, value in translations.items():
+        path = f"{prefix}{key}"
+        flat[path] = value
+        if isinstance(value, dict):
+            _flatten(value, f"{path}.", flat)
+    return flat
+
+
+class Translator:
+    """Переводы одного языка.
+
+    Объект не меняется после создания; ключи заранее развернуты в плоский
+    словарь, поэтому перевод - один поиск по словарю. Переводы заранее
+    сериализованы: json - словарь переводов в JSON, bundle - ответ
+    /api/translations/{language}, script - скрипт, задающий
+    window.translations; digest - хэш содержимого, modified - время
+    изменения файла переводов.
+    """
+
+    __slots__ = ('language', 'translations', '_flat', 'json', 'bundle',
+                 'script', 'digest', 'modified')
+
+    def __init__(self, language: str, translations: Dict[str, Any],
+                 modified: float = 0.0):
+        self.language = language
+        self.translations = translations
+        self._flat = MappingProxyType(_flatten(translations))
+        self.modified = modified
+
+        # Сериализация совпадает с JSONResponse
+        self.json = json.dumps(
+            translations, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.bundle = (b'{"language":' + json.dumps(language).encode() +
+                       b',"translations":' + self.json + b'}')
+        self.script = b'window.translations=' + self.json + b';'
+        self.digest = hashlib.sha256(self.json).hexdigest()[:16]
+
+    def translate(self, key: str) -> str:
+        """
+        Переводит ключ.
+
+        Args:
+            key: Ключ перевода в формате "section.subsection.key"
+
+        Returns:
+            Переведенная строка или исходный ключ, если перевод не найден
+        """
+        return self._flat.get(key, key)
+
 
 class I18n:
     """Класс для работы с переводами."""
 
     def __init__(self, locales_dir: str = "locales"):
         self.locales_dir = locales_dir
-        self.translations: Dict[str, Dict[str, Any]] = {}
-        self.current_language = "ru"
         self.supported_languages = ["ru", "en"]
+        self.translators: Dict[str, Translator] = {}
+        self._signature = None
+        self._watcher = None
+        self._stop = threading.Event()
         self.load_translations()
 
+    def _file_path(self, lang):
+        return os.path.join(self.locales_dir, f"{lang}.json")
+
+    def _files_signature(self):
+        """Отпечаток файлов переводов (время изменения и размер)."""
+        signature = []
+        for lang in self.supported_languages:
+            try:
+                stat = os.stat(self._file_path(lang))
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
     def load_translations(self):
         """Загружает переводы из JSON файлов."""
+        signature = self._files_signature()
+        translators = {}
         for lang in self.supported_languages:
-            file_path = os.path.join(self.locales_dir, f"{lang}.json")
+            file_path = self._file_path(lang)
             if os.path.exists(file_path):
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    self.translations[lang] = json.load(f)
-
-    def set_language(self, language: str):
-        """Устанавливает текущий язык."""
-        if language in self.supported_languages:
-            self.current_language = language
+                    translators[lang] = Translator(
+                        lang, json.load(f), os.path.getmtime(file_path))
+        # Словарь заменяется целиком, чтобы параллельные запросы видели
+        # либо старые, либо новые переводы
+        self.translators = translators
+        self._signature = signature
 
-    def get_language(self) -> str:
-        """Возвращает текущий язык."""
-        return self.current_language
+    def reload_if_changed(self):
+        """Перезагружает переводы, если файлы изменились.
 
-    def translate(self, key: str, language: str = None) -> str:
+        Returns:
+            bool: True, если переводы были перезагружены
         """
-        Переводит ключ на указанный язык.
+        if self._files_signature() == self._signature:
+            return False
+        try:
+            self.load_translations()
+        except (OSError, ValueError) as e:
+            # Файл может быть сохранен редактором не полностью - оставляем
+            # прежние переводы до следующей проверки
+            print(f"Ошибка перезагрузки переводов: {e}")
+            return False
+        print("Переводы перезагружены")
+        return True
+
+    def start_watching(self, interval=I18N_RELOAD_INTERVAL):
+        """Запускает фоновую проверку изменений файлов переводов.
 
         Args:
-            key: Ключ перевода в формате "section.subsection.key"
-            language: Язык перевода (если не указан, используется текущий)
-
-        Returns:
-            Переведенная строка или исходный ключ, если перевод не найден
+            interval: период проверки в секундах; 0 - не проверять
         """
-        lang = language or self.current_language
-
-        if lang not in self.translations:
-            return key
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(
+            target=watch, name="i18n-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Останавливает проверку изменений файлов переводов."""
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def translator(self, language: str = None) -> Translator:
+        """Возвращает переводчик для языка (или для языка по умолчанию)."""
+        translators = self.translators
+        translator = translators.get(language or DEFAULT_LANGUAGE)
+        if translator is None:
+            translator = translators.get(
+                DEFAULT_LANGUAGE, Translator(DEFAULT_LANGUAGE, {}))
+        return translator
 
-        # Получаем перевод по вложенному ключу
-        translation = self.translations[lang]
-        keys = key.split('.')
-
-        try:
-            for k in keys:
-                translation = translation[k]
-            return translation
-        except (KeyError, TypeError):
-            # Если перевод не найден, возвращаем исходный ключ
-            return key
+    def translate(self, key: str, language: str = None) -> str:
+        """Переводит ключ на указанный язык (по умолчанию DEFAULT_LANGUAGE)."""
+        return self.translator(language).translate(key)
 
     def get_all_translations(self, language: str = None) -> Dict[str, Any]:
         """Возвращает все переводы для указанного языка."""
-        lang = language or self.current_language
-        return self.translations.get(lang, {})
+        translator = self.translators.get(language or DEFAULT_LANGUAGE)
+        return translator.translations if translator else {}
 
     def get_supported_languages(self) -> list:
         """Возвращает список поддерживаемых языков."""
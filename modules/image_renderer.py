@@ -0,0 +1,152 @@
+"""Рендеринг статических графиков (PNG, SVG, WEBP) в пуле процессов.
+
+Графики строятся через объектный API matplotlib (Figure) без глобального
+состояния pyplot. Рендеринг выполняется в отдельных процессах, которые
+создаются при первом запросе изображения и остаются запущенными, поэтому
+matplotlib загружается в каждом из них один раз (и не загружается в
+веб-процессе). В процессы передаются только массивы NumPy, без DataFrame.
+"""
+
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (
+    FIGURE_SIZE, PLOT_STYLE, MARKER_SIZE, TITLE_FONT_SIZE, AXIS_FONT_SIZE,
+    LEGEND_FONT_SIZE, RENDER_PROCESSES, RENDER_QUEUE_SIZE, RENDER_DPI,
+    WORKER_TIMEOUT_SECONDS
+)
+from modules.worker_pool import WorkerPool
+
+# Поддерживаемые форматы изображений и их MIME-типы
+IMAGE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp'
+}
+
+# Заголовок и подпись оси Y для каждого статического графика
+PLOT_LABELS = {
+    'progress': ('Прогресс на LeetCode (с начала отслеживания)',
+                 'Решено задач (относительно старта)'),
+    'total': ('Общее количество решенных задач на LeetCode',
+              'Общее количество решенных задач')
+}
+
+
+def _init_worker():
+    """Подготавливает процесс рендеринга: загружает matplotlib заранее."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.dates  # noqa: F401
+
+
+def render_figure(chart, timestamps, usernames, values, width=None,
+                  height=None, dpi=RENDER_DPI, image_format='png'):
+    """Рисует линейный график по пользователям и возвращает байты изображения.
+
+    Args:
+        chart: имя графика из PLOT_LABELS
+        timestamps: массив int64 с временем замеров в наносекундах
+        usernames: имена пользователей (колонки values)
+        values: массив float64 формы [время, пользователь]
+        width, height: размер в пикселях (по умолчанию FIGURE_SIZE в дюймах)
+        dpi: разрешение
+        image_format: 'png', 'svg' или 'webp'
+
+    Returns:
+        bytes: Изображение в выбранном формате
+    """
+    import numpy as np
+    import matplotlib.dates as mdates
+    from matplotlib import style
+    from matplotlib.figure import Figure
+
+    title, ylabel = PLOT_LABELS[chart]
+    figsize = (width / dpi if width else FIGURE_SIZE[0],
+               height / dpi if height else FIGURE_SIZE[1])
+    dates = np.asarray(timestamps, dtype=np.int64).astype('datetime64[ns]')
+
+    # Стиль применяется только на время построения этой фигуры
+    with style.context(PLOT_STYLE):
+        fig = Figure(figsize=figsize)
+        ax = fig.add_subplot()
+
+        for position, username in enumerate(usernames):
+            ax.plot(
+                dates,
+                values[:, position],
+                marker='o',
+                linestyle='-',
+                markersize=MARKER_SIZE,
+                label=username)
+
+        ax.set_title(title, fontsize=TITLE_FONT_SIZE, pad=20)
+        ax.set_xlabel('Дата и время', fontsize=AXIS_FONT_SIZE)
+        ax.set_ylabel(ylabel, fontsize=AXIS_FONT_SIZE)
+        ax.legend(title='Участники', fontsize=LEGEND_FONT_SIZE)
+        ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+
+        # Улучшенное форматирование оси X
+        fig.autofmt_xdate(rotation=30, ha='right')
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
+
+        fig.tight_layout()
+
+        img = io.BytesIO()
+        fig.savefig(img, format=image_format, dpi=dpi)
+    return img.getvalue()
+
+
+def frame_to_arrays(df):
+    """Разбирает широкую таблицу на массивы для передачи в процесс."""
+    import numpy as np
+
+    return (df.index.asi8.copy(), list(df.columns),
+            df.to_numpy(dtype=np.float64))
+
+
+def _create_process_pool(max_workers):
+    """Создает пул процессов рендеринга.
+
+    Процессы запускаются методом spawn: веб-процесс многопоточный, и
+    копирование его состояния через fork небезопасно.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker)
+
+
+class ImageRenderer:
+    """Рендеринг статических графиков в пуле процессов."""
+
+    def __init__(self, processes=RENDER_PROCESSES,
+                 max_queue=RENDER_QUEUE_SIZE, timeout=WORKER_TIMEOUT_SECONDS):
+        self.pool = WorkerPool(
+            max_workers=processes,
+            max_queue=max_queue,
+            timeout=timeout,
+            executor_factory=_create_process_pool)
+
+    async def render(self, chart, arrays, width=None, height=None,
+                     dpi=RENDER_DPI, image_format='png'):
+        """Рендерит график в одном из процессов пула.
+
+        Args:
+            arrays: результат frame_to_arrays; таблицу нужно разобрать
+                заранее в пуле потоков, а не в цикле событий
+        """
+        timestamps, usernames, values = arrays
+        return await self.pool.run(
+            render_figure, chart, timestamps, usernames, values,
+            width, height, dpi, image_format)
+
+    def shutdown(self):
+        """Останавливает процессы рендеринга."""
+        self.pool.shutdown()
+
+
+# Создаем глобальный экземпляр
+image_renderer = ImageRenderer()
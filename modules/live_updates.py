@@ -0,0 +1,271 @@
+"""Передача новых замеров открытым страницам (Server-Sent Events).
+
+Каждая открытая страница держит одно соединение /api/stream. Проверка
+данных общая для всех подписчиков: после обновления через приложение
+(планировщик будит рассылку сразу) и раз в STREAM_POLL_INTERVAL секунд,
+если данные дописывает внешний сборщик. При изменении из истории
+выбираются только замеры новее уже отправленных, событие сериализуется
+один раз и рассылается всем подписчикам - стоимость не зависит от числа
+открытых страниц.
+
+Событие "samples":
+    id: время последнего замера в наносекундах (строкой)
+    data: {"samples": {метрика: {пользователь: [[x, y], ...]}},
+           "stats": {пользователь: последние значения},
+           "last_update": "..."}
+Метрики - ключи StoreFrames (total, easy, ..., progress_hard), x - время
+в миллисекундах, как в данных графиков. Переподключившийся клиент
+передает id последнего события (Last-Event-ID) и получает пропущенное.
+"""
+
+import asyncio
+
+from fastapi import HTTPException
+
+from modules.chart_cache import serialize_json
+from modules.worker_pool import worker_pool
+from config import (
+    USERNAMES, STREAM_POLL_INTERVAL, STREAM_KEEPALIVE_SECONDS,
+    STREAM_QUEUE_SIZE
+)
+
+# Клиенту: через сколько миллисекунд переподключаться после обрыва
+RECONNECT_DELAY_MS = 5000
+
+
+def _user_stats(store):
+    """Последние значения пользователей (как в статистике на странице)."""
+    stats = {}
+    for username in USERNAMES:
+        snapshot = store.snapshot(username)
+        if snapshot is None:
+            continue
+        stats[username] = {
+            'total': snapshot['total'],
+            'progress': snapshot['progress_total'],
+            'easy': snapshot['easy'],
+            'medium': snapshot['medium'],
+            'hard': snapshot['hard'],
+            'easy_progress': snapshot['progress_easy'],
+            'medium_progress': snapshot['progress_medium'],
+            'hard_progress': snapshot['progress_hard']
+        }
+    return stats
+
+
+def build_event(store, since):
+    """Строит событие с замерами новее since.
+
+    Args:
+        store: ProgressStore со всей историей
+        since: время последнего отправленного замера (нс) или None
+
+    Returns:
+        bytes: событие в формате text/event-stream или None, если новых
+        замеров нет
+    """
+    from modules.chart_creator import encode_series, SERIES_FORMAT_PAIRS
+    from modules.progress_store import StoreFrames
+
+    if not len(store):
+        return None
+    last = int(store.timestamps[-1])
+    if since is not None and last <= since:
+        return None
+
+    # Граница выборки включительная - берем следующую наносекунду;
+    # прогресс в выборке считается от начала всей истории
+    delta = StoreFrames(
+        store.select(start=since + 1) if since is not None else store)
+    samples = {}
+    for key in StoreFrames.KEYS:
+        frame = delta[key]
+        points = {}
+        for username in frame.columns:
+            values = frame[username].dropna()
+            if len(values):
+                points[username] = encode_series(values, SERIES_FORMAT_PAIRS)
+        if points:
+            samples[key] = points
+
+    last_timestamp = store.last_timestamp()
+    payload = {
+        'samples': samples,
+        'stats': _user_stats(store),
+        'last_update': (last_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+                        if last_timestamp is not None else None)
+    }
+    return (b'id: ' + str(last).encode() + b'\nevent: samples\ndata: ' +
+            serialize_json(payload) + b'\n\n')
+
+
+def _load_store():
+    """Загружает историю; None, если данных пока нет."""
+    from modules.data_processor import load_store_with_version
+
+    try:
+        return load_store_with_version()
+    except HTTPException:
+        return None, None
+
+
+def catch_up(since):
+    """Событие с замерами, пропущенными клиентом (новее since), или None."""
+    store, _ = _load_store()
+    if store is None:
+        return None
+    return build_event(store, since)
+
+
+class SampleBroadcaster:
+    """Рассылка новых замеров подписчикам /api/stream.
+
+    Args:
+        poll_interval: период проверки данных в секундах; 0 - только по
+            сигналу notify (после обновления через приложение)
+        keepalive: период комментариев keep-alive в секундах
+        queue_size: сколько событий может ожидать отправки подписчику
+    """
+
+    def __init__(self, poll_interval=STREAM_POLL_INTERVAL,
+                 keepalive=STREAM_KEEPALIVE_SECONDS,
+                 queue_size=STREAM_QUEUE_SIZE):
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self._task = None
+        self._wakeup = None
+        # Версия данных последней проверки и время последнего
+        # отправленного замера (нс)
+        self._version = None
+        self._since = None
+
+    def start(self):
+        """Запускает проверку новых замеров."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Останавливает проверку и закрывает потоки подписчиков."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in list(self.subscribers):
+            self._close(queue)
+
+    def notify(self):
+        """Требует проверить данные сейчас (вызывается из цикла событий)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def subscribe(self):
+        """Регистрирует подписчика и возвращает его очередь событий."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        self.notify()
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _close(self, queue):
+        """Завершает поток подписчика: в очереди остается только None."""
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _publish(self, event):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать - закрываем поток; браузер
+                # переподключится с Last-Event-ID и получит пропущенное
+                self._close(queue)
+
+    def _check(self):
+        """Возвращает событие с новыми замерами или None (в пуле потоков)."""
+        store, version = _load_store()
+        if store is None or version == self._version:
+            return None
+        self._version = version
+        since = self._since
+        self._since = int(store.timestamps[-1])
+        # Первая проверка только запоминает, что уже есть: новые клиенты
+        # догружают пропущенное сами (catch_up)
+        if since is None:
+            return None
+        return build_event(store, since)
+
+    async def _run(self):
+        timeout = self.poll_interval if self.poll_interval > 0 else None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self.subscribers:
+                continue
+            try:
+                event = await worker_pool.run(self._check)
+            except Exception as e:
+                print(f"Ошибка проверки новых замеров: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                continue
+            if event is not None:
+                self._publish(event)
+
+    async def stream(self, since=None):
+        """Генератор тела ответа /api/stream.
+
+        Подписка оформляется при первой итерации, внутри try: если ответ
+        не начался (клиент отключился раньше), очередь не создается, а
+        начатая подписка всегда снимается в finally.
+
+        Args:
+            since: время последнего замера, который уже есть у клиента (нс)
+        """
+        queue = None
+        try:
+            # Подписка - до догрузки пропущенного, чтобы не потерять
+            # замеры, разосланные в это время
+            queue = self.subscribe()
+            yield f'retry: {RECONNECT_DELAY_MS}\n\n'.encode()
+            if since is not None:
+                try:
+                    event = await worker_pool.run(catch_up, since)
+                except Exception as e:
+                    # Закрываем поток: клиент переподключится и повторит
+                    # догрузку, а не пропустит замеры
+                    print(f"Ошибка догрузки замеров: {str(e)}")
+                    return
+                if event is not None:
+                    yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(),
+                                                   self.keepalive)
+                except asyncio.TimeoutError:
+                    # Комментарий не дает прокси закрыть простаивающее
+                    # соединение
+                    yield b': keepalive\n\n'
+                    continue
+                if event is None:
+                    break
+                yield event
+        finally:
+            if queue is not None:
+                self.unsubscribe(queue)
+
+
+# Создаем глобальный экземпляр
+broadcaster = SampleBroadcaster()
@@ -0,0 +1,464 @@
+"""Компактное хранение истории замеров в памяти.
+
+Вместо восьми широких таблиц float64 (количество и прогресс по каждой
+метрике) вся история хранится в трех массивах: время замеров (int64),
+список пользователей и количества int32 формы [время, пользователь,
+метрика]. Отсутствующие значения хранятся как MISSING_COUNT. Прогресс и
+широкие таблицы строятся по запросу.
+
+Для длинных диапазонов есть агрегаты по часам, дням, неделям и месяцам
+(Rollup). Они строятся при первом запросе и затем обновляются при каждом
+слиянии новых замеров, пересчитывая только последние интервалы.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from modules.storage import COUNT_COLUMNS, MISSING_COUNT
+from modules.utils import RESOLUTIONS
+
+# Метрики в порядке последней оси массива количеств
+METRICS = ('total', 'easy', 'medium', 'hard')
+
+# Ключ таблицы прогресса для каждой метрики
+PROGRESS_KEYS = {
+    'total': 'progress_total',
+    'easy': 'progress_easy',
+    'medium': 'progress_medium',
+    'hard': 'progress_hard'
+}
+
+HOUR_NS = 3_600_000_000_000
+DAY_NS = 24 * HOUR_NS
+
+
+def _edge_rows(counts):
+    """Находит первую и последнюю строку со значением.
+
+    Returns:
+        tuple: два массива int64 формы [пользователь, метрика], -1 если
+        значений нет
+    """
+    if not len(counts):
+        empty = np.full(counts.shape[1:], -1, dtype=np.int64)
+        return empty, empty.copy()
+
+    valid = counts != MISSING_COUNT
+    present = valid.any(axis=0)
+    first = valid.argmax(axis=0).astype(np.int64)
+    last = len(counts) - 1 - valid[::-1].argmax(axis=0).astype(np.int64)
+    first[~present] = -1
+    last[~present] = -1
+    return first, last
+
+
+def bucket_starts(timestamps, resolution):
+    """Возвращает начало интервала resolution для каждого времени.
+
+    Недели начинаются с понедельника.
+
+    Args:
+        timestamps: массив int64 с временем в наносекундах
+        resolution: одно из RESOLUTIONS
+    """
+    if resolution == 'hour':
+        return timestamps - timestamps % HOUR_NS
+    if resolution == 'day':
+        return timestamps - timestamps % DAY_NS
+    if resolution == 'week':
+        # 1 января 1970 года - четверг
+        days = timestamps // DAY_NS
+        return (days - (days + 3) % 7) * DAY_NS
+    if resolution == 'month':
+        return timestamps.view('datetime64[ns]').astype(
+            'datetime64[M]').astype('datetime64[ns]').view(np.int64)
+    raise ValueError(f"Неизвестный интервал агрегации: {resolution}")
+
+
+def _aggregate(timestamps, counts, resolution):
+    """Последние значения по интервалам.
+
+    Returns:
+        tuple: (начала интервалов, последние значения); значения - int32
+        формы [интервал, пользователь, метрика]
+    """
+    if not len(timestamps):
+        return timestamps, counts
+
+    buckets = bucket_starts(timestamps, resolution)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    rows = np.arange(len(counts), dtype=np.int32)[:, None, None]
+    valid = counts != MISSING_COUNT
+    last_rows = np.maximum.reduceat(np.where(valid, rows, -1), starts, axis=0)
+
+    users = np.arange(counts.shape[1])[None, :, None]
+    metrics = np.arange(counts.shape[2])[None, None, :]
+    last = np.where(
+        last_rows >= 0, counts[np.maximum(last_rows, 0), users, metrics],
+        MISSING_COUNT)
+    return buckets[starts], last
+
+
+class Rollup:
+    """Агрегаты истории по интервалам времени (час, день, неделя, месяц).
+
+    store - ProgressStore, в котором каждому интервалу соответствует одна
+    строка с последними значениями за интервал, поэтому графики строятся
+    по нему так же, как по исходным замерам; прогресс считается от первого
+    замера за всю историю.
+    """
+
+    def __init__(self, resolution, store):
+        self.resolution = resolution
+        self.store = store
+
+    @classmethod
+    def build(cls, source, resolution, previous=None, cut=0):
+        """Строит агрегаты по истории source.
+
+        Если передан previous - агрегаты той же истории до слияния, а cut -
+        первая измененная строка source, пересчитываются только интервалы
+        начиная с интервала этой строки.
+        """
+        keep = 0
+        begin = 0
+        if (previous is not None and cut < len(source) and
+                previous.store.usernames == source.usernames):
+            bucket = bucket_starts(source.timestamps[cut:cut + 1], resolution)
+            keep = previous.store.timestamps.searchsorted(bucket[0], 'left')
+            begin = source.timestamps.searchsorted(bucket[0], 'left')
+
+        timestamps, last = _aggregate(
+            source.timestamps[begin:], source.counts[begin:], resolution)
+        if keep:
+            timestamps = np.concatenate(
+                [previous.store.timestamps[:keep], timestamps])
+            last = np.concatenate([previous.store.counts[:keep], last])
+
+        return cls(
+            resolution,
+            ProgressStore(timestamps, source.usernames, last,
+                          source.baseline()))
+
+
+class ProgressStore:
+    """История замеров: время, пользователи и количества по метрикам.
+
+    Хранилище неизменяемо: merge и select возвращают новый объект, поэтому
+    его можно безопасно читать из нескольких потоков.
+    """
+
+    def __init__(self, timestamps=None, usernames=(), counts=None,
+                 baseline=None, edges=None):
+        self.timestamps = (timestamps if timestamps is not None
+                           else np.empty(0, dtype=np.int64))
+        self.usernames = list(usernames)
+        self.counts = (counts if counts is not None else np.empty(
+            (0, len(self.usernames), len(METRICS)), dtype=np.int32))
+        self._ids = {username: i for i, username in enumerate(self.usernames)}
+        # Первые значения метрик [пользователь, метрика]; для выборки
+        # берутся из полной истории
+        self._baseline = baseline
+        # Индекс первых и последних строк со значениями (см. _edge_rows);
+        # поддерживается при слиянии, поэтому последние значения
+        # доступны без просмотра истории
+        self._edges = edges
+        # Агрегаты по интервалам (resolution -> Rollup), см. rollup()
+        self._rollups = {}
+        # Для результата overlay: (исходное хранилище, первая измененная
+        # строка); агрегаты строятся от агрегатов исходного хранилища
+        self._base = None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        """Объем памяти, занимаемый массивами."""
+        return self.timestamps.nbytes + self.counts.nbytes
+
+    def edges(self):
+        """Возвращает индекс первых и последних строк со значениями."""
+        if self._edges is None:
+            self._edges = _edge_rows(self.counts)
+        return self._edges
+
+    def _values_at(self, rows):
+        """Значения по строкам формы [пользователь, метрика] (NaN для -1)."""
+        values = np.full(rows.shape, np.nan)
+        users, metrics = np.nonzero(rows >= 0)
+        values[users, metrics] = self.counts[
+            rows[users, metrics], users, metrics]
+        return values
+
+    def has_values(self, metric):
+        """Проверяет, есть ли хотя бы одно значение метрики."""
+        return bool((self.edges()[1][:, METRICS.index(metric)] >= 0).any())
+
+    def latest_values(self):
+        """Последние значения [пользователь, метрика] (NaN, если нет)."""
+        return self._values_at(self.edges()[1])
+
+    def snapshot(self, username):
+        """Последние значения и прогресс пользователя.
+
+        Для полной истории работает за O(1): используется индекс последних
+        строк, а не просмотр всех замеров.
+
+        Returns:
+            dict: значения по ключам METRICS и PROGRESS_KEYS (0, если
+            значений нет) или None, если у пользователя нет замеров
+        """
+        user = self._ids.get(username)
+        last = self.edges()[1]
+        if user is None or last[user, 0] < 0:
+            return None
+
+        snapshot = {}
+        baseline = self.baseline()
+        for m, metric in enumerate(METRICS):
+            row = last[user, m]
+            if row < 0:
+                snapshot[metric] = 0
+                snapshot[PROGRESS_KEYS[metric]] = 0
+                continue
+            value = int(self.counts[row, user, m])
+            snapshot[metric] = value
+            snapshot[PROGRESS_KEYS[metric]] = int(value - baseline[user, m])
+        return snapshot
+
+    def last_timestamp(self, metric='total'):
+        """Время последнего замера метрики или None."""
+        rows = self.edges()[1][:, METRICS.index(metric)]
+        if not len(rows) or rows.max() < 0:
+            return None
+        return pd.Timestamp(self.timestamps[rows.max()])
+
+    def merge(self, df):
+        """Возвращает новое хранилище с добавленными строками длинного формата.
+
+        Пересчитывается только хвост истории начиная с самого раннего
+        нового замера. Если для пользователя в один момент есть несколько
+        записей, используется последняя.
+        """
+        if df is None or df.empty:
+            return self
+        return self._merge(df)[0]
+
+    def overlay(self, df):
+        """Как merge, но для временных строк поверх этого хранилища.
+
+        Агрегаты результата строятся от агрегатов этого хранилища (они
+        сохраняются в нем), пересчитываются только затронутые интервалы.
+        Используется для незавершенной записи и незаписанных проверок,
+        которые при следующем чтении заменяются новыми.
+        """
+        if df is None or df.empty:
+            return self
+        merged, cut = self._merge(df)
+        merged._base = (self, cut)
+        return merged
+
+    def _merge(self, df):
+        """Сливает строки; возвращает (хранилище, первая измененная строка)."""
+
+        # Пользователи хранятся по алфавиту, как колонки сводных таблиц
+        usernames = sorted(set(self.usernames).union(df['username']))
+        counts = self.counts
+        if usernames != self.usernames:
+            ids = {username: i for i, username in enumerate(usernames)}
+            counts = np.full(
+                (len(self), len(usernames), len(METRICS)), MISSING_COUNT,
+                dtype=np.int32)
+            counts[:, [ids[username] for username in self.usernames]] = (
+                self.counts)
+        ids = {username: i for i, username in enumerate(usernames)}
+
+        new_timestamps = df['timestamp'].to_numpy(
+            dtype='datetime64[ns]').view(np.int64)
+        user_ids = df['username'].map(ids).to_numpy(dtype=np.int64)
+        values = np.full((len(df), len(METRICS)), MISSING_COUNT,
+                         dtype=np.int32)
+        for i, column in enumerate(COUNT_COLUMNS):
+            if column in df.columns:
+                values[:, i] = df[column].fillna(MISSING_COUNT).to_numpy()
+
+        cut = self.timestamps.searchsorted(new_timestamps.min(), 'left')
+        tail_timestamps = np.union1d(self.timestamps[cut:], new_timestamps)
+        tail = np.full(
+            (len(tail_timestamps), len(usernames), len(METRICS)),
+            MISSING_COUNT, dtype=np.int32)
+        old_rows = tail_timestamps.searchsorted(self.timestamps[cut:])
+        tail[old_rows] = counts[cut:]
+
+        rows = tail_timestamps.searchsorted(new_timestamps)
+        # Отсутствующие в новой записи метрики не затирают известные
+        tail[rows, user_ids] = np.where(
+            values != MISSING_COUNT, values, tail[rows, user_ids])
+
+        # Индекс первых и последних строк: голова истории не изменилась,
+        # поэтому достаточно просмотреть только новый хвост
+        old_first = np.full((len(usernames), len(METRICS)), -1, np.int64)
+        old_first[[ids[username] for username in self.usernames]] = (
+            self.edges()[0])
+        tail_first, tail_last = _edge_rows(tail)
+        first = np.where(
+            (old_first >= 0) & (old_first < cut), old_first,
+            np.where(tail_first >= 0, tail_first + cut, -1))
+        # Значения старого хвоста вошли в новый, поэтому прежняя последняя
+        # строка нужна, только если в новом хвосте значений нет
+        old_last = np.full((len(usernames), len(METRICS)), -1, np.int64)
+        old_last[[ids[username] for username in self.usernames]] = (
+            self.edges()[1])
+        last = np.where(tail_last >= 0, tail_last + cut, old_last)
+
+        merged = ProgressStore(
+            np.concatenate([self.timestamps[:cut], tail_timestamps]),
+            usernames,
+            np.concatenate([counts[:cut], tail]),
+            edges=(first, last))
+        # Уже построенные агрегаты обновляются с первого измененного интервала
+        for resolution, rollup in list(self._rollups.items()):
+            merged._rollups[resolution] = Rollup.build(
+                merged, resolution, rollup, cut)
+        return merged, cut
+
+    def rollup(self, resolution):
+        """Возвращает агрегаты истории по интервалам resolution (Rollup).
+
+        Агрегаты строятся при первом запросе и дальше поддерживаются при
+        слиянии новых замеров.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Неизвестный интервал агрегации: {resolution}")
+        rollup = self._rollups.get(resolution)
+        if rollup is None:
+            if self._base is not None:
+                base, cut = self._base
+                rollup = Rollup.build(
+                    self, resolution, base.rollup(resolution), cut)
+            else:
+                rollup = Rollup.build(self, resolution)
+            self._rollups[resolution] = rollup
+        return rollup
+
+    def baseline(self):
+        """Первое известное значение каждой метрики каждого пользователя.
+
+        Returns:
+            numpy.ndarray: float64 формы [пользователь, метрика], NaN если
+            значений нет
+        """
+        if self._baseline is None:
+            self._baseline = self._values_at(self.edges()[0])
+        return self._baseline
+
+    def select(self, start=None, end=None, users=None):
+        """Возвращает часть истории: диапазон времени и пользователей.
+
+        Время отсортировано, поэтому границы находятся бинарным поиском, а
+        диапазон берется срезом массивов без копирования. Прогресс в
+        выборке считается от первого замера за всю историю.
+
+        Args:
+            start, end: границы диапазона (включительно) или None
+            users: имена пользователей в нужном порядке или None
+        """
+        begin = 0
+        finish = len(self)
+        if start is not None:
+            begin = self.timestamps.searchsorted(
+                pd.Timestamp(start).value, 'left')
+        if end is not None:
+            finish = self.timestamps.searchsorted(
+                pd.Timestamp(end).value, 'right')
+
+        counts = self.counts[begin:finish]
+        usernames = self.usernames
+        baseline = self.baseline()
+        if users is not None:
+            ids = {username: i for i, username in enumerate(self.usernames)}
+            usernames = [username for username in users if username in ids]
+            columns = [ids[username] for username in usernames]
+            counts = counts[:, columns]
+            baseline = baseline[columns]
+
+        return ProgressStore(
+            self.timestamps[begin:finish], usernames, counts, baseline)
+
+    def frame(self, metric, progress=False):
+        """Строит широкую таблицу метрики.
+
+        Строки - время замеров, колонки - пользователи. Как и сводная
+        таблица, не содержит строк и колонок без значений.
+
+        Args:
+            metric: одна из METRICS
+            progress: вернуть прогресс относительно первого замера
+        """
+        m = METRICS.index(metric)
+        values = self.counts[:, :, m]
+        valid = values != MISSING_COUNT
+        rows = valid.any(axis=1)
+        columns = valid.any(axis=0)
+        if not rows.any():
+            return pd.DataFrame()
+
+        valid = valid[rows][:, columns]
+        data = values[rows][:, columns].astype(np.float64)
+        data[~valid] = np.nan
+        if progress:
+            data -= self.baseline()[columns, m]
+
+        index = pd.DatetimeIndex(
+            self.timestamps[rows].view('datetime64[ns]'), name='timestamp')
+        names = pd.Index(
+            [username for username, keep in zip(self.usernames, columns)
+             if keep], name='username')
+        return pd.DataFrame(data, index=index, columns=names)
+
+
+class StoreFrames(Mapping):
+    """Представление ProgressStore в виде словаря DataFrame.
+
+    Ключи те же, что у прежнего результата load_and_process_data: метрики
+    и их прогресс. Таблица строится при первом обращении к ключу и
+    хранится только пока существует этот объект.
+    """
+
+    KEYS = METRICS + tuple(PROGRESS_KEYS.values())
+
+    def __init__(self, store):
+        self.store = store
+        self._frames = {}
+
+    def __getitem__(self, key):
+        frame = self._frames.get(key)
+        if frame is None:
+            if key in METRICS:
+                frame = self.store.frame(key)
+            elif key in self.KEYS:
+                metric = key[len('progress_'):]
+                frame = self.store.frame(metric, progress=True)
+            else:
+                raise KeyError(key)
+            self._frames[key] = frame
+        return frame
+
+    def has_values(self, key):
+        """Проверяет, что таблица key не пуста, не строя ее."""
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key in self._frames:
+            return not self._frames[key].empty
+        if key not in METRICS:
+            key = key[len('progress_'):]
+        return self.store.has_values(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
@@ -0,0 +1,134 @@
+"""Фоновый планировщик сбора данных LeetCode.
+
+Сбор выполняется в том же процессе, что и веб-приложение, в отдельном
+потоке, поэтому не блокирует цикл событий. Повторные запросы на обновление,
+пришедшие во время выполнения сбора, присоединяются к текущему заданию.
+"""
+
+import asyncio
+import sys
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from config import UPDATE_INTERVAL_MINUTES, UPDATE_JOBS_HISTORY
+
+# Статусы заданий
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def collect_data():
+    """Запускает сбор данных.
+
+    Сборщик (и requests) загружается при первом обновлении, а не при
+    запуске приложения.
+    """
+    from data_collector import update_progress_data
+    return update_progress_data()
+
+
+def _invalidate_data_cache():
+    """Помечает кэш данных устаревшим, если данные уже загружались."""
+    data_processor = sys.modules.get('modules.data_processor')
+    if data_processor is not None:
+        data_processor.invalidate_cache()
+
+
+def _notify_live_updates():
+    """Будит рассылку новых замеров, если она используется."""
+    live_updates = sys.modules.get('modules.live_updates')
+    if live_updates is not None:
+        live_updates.broadcaster.notify()
+
+
+class CollectionScheduler:
+    """Планировщик заданий сбора данных."""
+
+    def __init__(self, collect=collect_data,
+                 interval_minutes=UPDATE_INTERVAL_MINUTES,
+                 history_size=UPDATE_JOBS_HISTORY):
+        self.collect = collect
+        self.interval_minutes = interval_minutes
+        self.history_size = history_size
+        self.jobs = OrderedDict()
+        self.current_job = None
+        self._periodic_task = None
+        self._job_tasks = set()
+
+    def trigger(self, source='manual'):
+        """Запускает сбор данных или возвращает уже выполняющееся задание."""
+        if self.current_job is not None:
+            return self.current_job
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': STATUS_PENDING,
+            'source': source,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        self.jobs[job['job_id']] = job
+        while len(self.jobs) > self.history_size:
+            self.jobs.popitem(last=False)
+
+        self.current_job = job
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        # Храним ссылку на задачу, чтобы ее не удалил сборщик мусора
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+        return job
+
+    def get_job(self, job_id):
+        """Возвращает задание по идентификатору или None."""
+        return self.jobs.get(job_id)
+
+    async def _run(self, job):
+        """Выполняет сбор данных в отдельном потоке."""
+        job['status'] = STATUS_RUNNING
+        job['started_at'] = datetime.now().isoformat()
+        try:
+            job['result'] = await asyncio.to_thread(self.collect)
+            job['status'] = STATUS_DONE
+        except Exception as e:
+            print(f"Ошибка фонового обновления данных: {str(e)}")
+            job['error'] = str(e)
+            job['status'] = STATUS_FAILED
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            self.current_job = None
+            _invalidate_data_cache()
+            _notify_live_updates()
+
+    async def _run_periodically(self):
+        """Запускает сбор данных с интервалом из конфигурации."""
+        while True:
+            await asyncio.sleep(self.interval_minutes * 60)
+            self.trigger(source='schedule')
+
+    def start(self):
+        """Запускает периодический сбор, если он включен в конфигурации."""
+        if self.interval_minutes > 0 and self._periodic_task is None:
+            self._periodic_task = asyncio.get_running_loop().create_task(
+                self._run_periodically())
+
+    async def stop(self):
+        """Останавливает периодический сбор и дожидается текущего задания."""
+        if self._periodic_task is not None:
+            self._periodic_task.cancel()
+            try:
+                await self._periodic_task
+            except asyncio.CancelledError:
+                pass
+            self._periodic_task = None
+        if self._job_tasks:
+            await asyncio.gather(*self._job_tasks, return_exceptions=True)
+
+
+# Создаем глобальный экземпляр
+scheduler = CollectionScheduler()
@@ -0,0 +1,547 @@
+"""Хранилища истории замеров LeetCode.
+
+Поддерживаются два формата:
+- ``csv`` - исходный "длинный" CSV файл (по умолчанию);
+- ``numpy`` - колоночный бинарный формат: отдельные файлы для меток времени
+  (int64, наносекунды), идентификаторов пользователей (int32) и количества
+  задач (int32), которые читаются через memory-map без разбора текста.
+
+Оба хранилища умеют отдавать только записи, добавленные с прошлого чтения,
+что используется инкрементальным загрузчиком в data_processor.
+
+Время последней проверки пользователей хранится отдельно (Heartbeat), что
+позволяет записывать в историю только изменившиеся значения.
+
+Запись выполняется под исключительной межпроцессной блокировкой
+(file_lock) и сбрасывается на диск до того, как становится видна
+читателям; чтение - под разделяемой блокировкой. Полная перезапись
+создает новый файл и атомарно подменяет им старый. Поэтому несколько
+сборщиков и веб-процессов могут работать с одними данными одновременно,
+а читатели видят только полностью записанные пакеты.
+"""
+
+import csv
+import io
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CSV_FILE, CSV_ENCODING, STORAGE_BACKEND, NUMPY_STORAGE_DIR, HEARTBEAT_FILE
+)
+from modules.file_lock import file_lock
+
+# Колонки "длинного" формата
+CSV_HEADERS = [
+    'timestamp',
+    'username',
+    'total_solved',
+    'easy_solved',
+    'medium_solved',
+    'hard_solved']
+COUNT_COLUMNS = CSV_HEADERS[2:]
+
+# Значение для отсутствующего количества в колоночном формате
+MISSING_COUNT = -1
+
+# Результат чтения хранилища:
+# frame - новые завершенные записи (timestamp уже приведен к datetime),
+# pending - запись, которая, возможно, еще дописывается (или None),
+# cursor - позиция для следующего чтения,
+# full - True, если хранилище прочитано целиком и прошлое состояние неактуально
+ReadResult = namedtuple('ReadResult', ['frame', 'pending', 'cursor', 'full'])
+
+
+def _replace(tmp_path, path):
+    """Атомарно заменяет path записанным файлом tmp_path.
+
+    На POSIX каталог тоже сбрасывается на диск, чтобы замена пережила
+    сбой питания.
+    """
+    os.replace(tmp_path, path)
+    if os.name == 'posix':
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class CsvStorage:
+    """Хранилище в виде CSV файла."""
+
+    # Сколько байт перед последней прочитанной позицией сверяем, чтобы
+    # убедиться, что файл только дописывался, а не был перезаписан
+    TAIL_CHECK_SIZE = 256
+
+    # Сколько байт с конца файла читать при поиске незавершенной строки
+    TAIL_READ_SIZE = 65536
+
+    def __init__(self, path=CSV_FILE):
+        self.path = path
+
+    def exists(self):
+        """Проверяет, существует ли файл с данными."""
+        return os.path.exists(self.path)
+
+    def lock(self, shared=False):
+        """Возвращает блокировку файла (см. file_lock)."""
+        return file_lock(self.path, shared)
+
+    def signature(self):
+        """Возвращает отпечаток файла для проверки актуальности кэша."""
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def read(self, cursor=None):
+        """Читает записи, добавленные после позиции cursor.
+
+        Чтение идет под разделяемой блокировкой, поэтому пакет записей,
+        который дописывается в этот момент, не виден. Последняя строка без
+        перевода строки (файл правили вручную или запись была прервана)
+        возвращается отдельно и не сдвигает позицию чтения.
+        """
+        with self.lock(shared=True), open(self.path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            if cursor is not None and self._can_append(f, inode, cursor):
+                f.seek(cursor['offset'])
+                columns = cursor['columns']
+                offset = cursor['offset']
+                tail_check = cursor['tail_check']
+                full = False
+            else:
+                header = f.readline()
+                if not header.endswith(b'\n'):
+                    return ReadResult(None, None, None, True)
+                columns = list(pd.read_csv(io.BytesIO(header)).columns)
+                offset = len(header)
+                tail_check = header[-self.TAIL_CHECK_SIZE:]
+                full = True
+            chunk = f.read()
+
+        end = chunk.rfind(b'\n') + 1
+        complete, pending = chunk[:end], chunk[end:]
+        if complete:
+            offset += end
+            tail_check = (tail_check + complete)[-self.TAIL_CHECK_SIZE:]
+
+        cursor = {
+            'inode': inode,
+            'offset': offset,
+            'tail_check': tail_check,
+            'columns': columns
+        }
+        return ReadResult(
+            self._parse(complete, columns) if complete else None,
+            self._parse_pending(pending, columns),
+            cursor,
+            full)
+
+    def _can_append(self, f, inode, cursor):
+        """Проверяет, что файл только дописывался с момента прошлого чтения."""
+        if inode != cursor['inode']:
+            return False
+        if os.fstat(f.fileno()).st_size < cursor['offset']:
+            return False
+        tail_check = cursor['tail_check']
+        f.seek(cursor['offset'] - len(tail_check))
+        return f.read(len(tail_check)) == tail_check
+
+    @staticmethod
+    def _parse(chunk, columns):
+        """Разбирает строки CSV без заголовка."""
+        df = pd.read_csv(io.BytesIO(chunk), header=None, names=columns)
+        # Преобразуем строку с timestamp в объект datetime
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+
+    @classmethod
+    def _parse_pending(cls, chunk, columns):
+        """Разбирает незавершенную строку, если она уже выглядит полной."""
+        if not chunk.strip():
+            return None
+        try:
+            df = cls._parse(chunk, columns)
+        except (ValueError, pd.errors.ParserError):
+            # Строка еще дописывается - учтем ее при следующем чтении
+            return None
+        if df.empty or df.isna().any(axis=None):
+            return None
+        return df
+
+    def append(self, rows):
+        """Добавляет записи (timestamp, username, total, easy, medium, hard).
+
+        Все записи пишутся одним вызовом write и сбрасываются на диск под
+        исключительной блокировкой.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(rows)
+
+        with self.lock():
+            is_new = not os.path.exists(self.path) or not os.path.getsize(
+                self.path)
+            if is_new:
+                header = io.StringIO()
+                csv.writer(header).writerow(CSV_HEADERS)
+                data = header.getvalue() + buffer.getvalue()
+            else:
+                self._repair_tail()
+                data = buffer.getvalue()
+
+            with open(self.path, 'a', newline='', encoding=CSV_ENCODING) as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _repair_tail(self):
+        """Завершает или отбрасывает последнюю строку без перевода строки.
+
+        Если строка разбирается как полная запись (файл правили вручную),
+        она завершается переводом строки, иначе это остаток прерванной
+        записи, и он обрезается. Вызывается под исключительной блокировкой.
+        """
+        with open(self.path, 'r+b') as f:
+            header = f.readline()
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - self.TAIL_READ_SIZE, 0))
+            chunk = f.read()
+            tail = chunk[chunk.rfind(b'\n') + 1:]
+            if not tail:
+                return
+
+            if header.endswith(b'\n'):
+                columns = list(pd.read_csv(io.BytesIO(header)).columns)
+                complete = self._parse_pending(tail, columns) is not None
+            else:
+                # В файле только заголовок
+                complete = True
+
+            if complete:
+                f.write(b'\n')
+            else:
+                f.truncate(size - len(tail))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_frame(self, df):
+        """Полностью перезаписывает файл данными из DataFrame.
+
+        Данные пишутся во временный файл, который затем атомарно заменяет
+        исходный.
+        """
+        df = df.copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp']).map(
+            lambda ts: ts.isoformat())
+        tmp_path = self.path + '.tmp'
+        with self.lock():
+            with open(tmp_path, 'w', newline='', encoding=CSV_ENCODING) as f:
+                df[CSV_HEADERS].to_csv(f, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+            _replace(tmp_path, self.path)
+
+
+class NumpyStorage:
+    """Колоночное хранилище на основе бинарных файлов NumPy.
+
+    Каталог содержит файлы ``timestamp.<N>.i64``, ``user_id.<N>.i32``,
+    ``counts.<N>.i32`` (по четыре значения на запись), где N - номер
+    поколения, и ``meta.json`` с текущим поколением, списком пользователей
+    и числом записей. meta.json обновляется последним, поэтому читатели видят
+    только полностью записанные записи, а полная перезапись создает новое
+    поколение файлов и не мешает уже открытым читателям.
+    """
+
+    META_FILE = 'meta.json'
+    TIMESTAMP_FILE = 'timestamp.{}.i64'
+    USER_ID_FILE = 'user_id.{}.i32'
+    COUNTS_FILE = 'counts.{}.i32'
+
+    def __init__(self, directory=NUMPY_STORAGE_DIR):
+        self.directory = directory
+
+    def _file(self, name, generation=None):
+        if generation is not None:
+            name = name.format(generation)
+        return os.path.join(self.directory, name)
+
+    def exists(self):
+        """Проверяет, существует ли хранилище."""
+        return os.path.exists(self._file(self.META_FILE))
+
+    def lock(self, shared=False):
+        """Возвращает блокировку хранилища (см. file_lock)."""
+        return file_lock(self.directory, shared)
+
+    def signature(self):
+        """Возвращает отпечаток метаданных для проверки актуальности кэша."""
+        stat = os.stat(self._file(self.META_FILE))
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def read_meta(self):
+        """Читает метаданные хранилища."""
+        with open(self._file(self.META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        tmp_path = self._file(self.META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, self._file(self.META_FILE))
+
+    def _memmap(self, name, generation, dtype, rows, width=None):
+        shape = (rows, width) if width else (rows,)
+        if rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._file(name, generation), dtype=dtype, mode='r',
+                         shape=shape)
+
+    def read_arrays(self, start=0, meta=None):
+        """Возвращает массивы (timestamps, user_ids, counts) начиная с записи start."""
+        meta = meta or self.read_meta()
+        rows, generation = meta['rows'], meta['generation']
+        timestamps = self._memmap(
+            self.TIMESTAMP_FILE, generation, np.int64, rows)
+        user_ids = self._memmap(self.USER_ID_FILE, generation, np.int32, rows)
+        counts = self._memmap(
+            self.COUNTS_FILE, generation, np.int32, rows, len(COUNT_COLUMNS))
+        return timestamps[start:], user_ids[start:], counts[start:]
+
+    def read(self, cursor=None):
+        """Читает записи, добавленные после позиции cursor.
+
+        Видны только записи, учтенные в meta.json. Файлы открываются под
+        разделяемой блокировкой, чтобы перезапись не удалила их раньше.
+        """
+        with self.lock(shared=True):
+            meta = self.read_meta()
+            full = (cursor is None or
+                    cursor['generation'] != meta['generation'] or
+                    cursor['rows'] > meta['rows'])
+            start = 0 if full else cursor['rows']
+            cursor = {'generation': meta['generation'], 'rows': meta['rows']}
+            if meta['rows'] == start:
+                return ReadResult(None, None, cursor, full)
+
+            timestamps, user_ids, counts = self.read_arrays(start, meta)
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(np.asarray(timestamps), unit='ns'),
+            'username': pd.Categorical.from_codes(
+                np.asarray(user_ids), categories=meta['users'])
+        })
+        for i, column in enumerate(COUNT_COLUMNS):
+            if column not in meta['columns']:
+                continue
+            values = np.asarray(counts[:, i])
+            if (values == MISSING_COUNT).any():
+                values = np.where(values == MISSING_COUNT, np.nan, values)
+            df[column] = values
+        # pivot_table ожидает обычные строки в колонке пользователей
+        df['username'] = df['username'].astype(object)
+        return ReadResult(df, None, cursor, full)
+
+    def _encode(self, df, users):
+        """Переводит DataFrame длинного формата в колоночные массивы."""
+        index = {username: i for i, username in enumerate(users)}
+        for username in pd.unique(df['username']):
+            if username not in index:
+                index[username] = len(users)
+                users.append(username)
+
+        timestamps = pd.to_datetime(df['timestamp']).to_numpy(
+            dtype='datetime64[ns]').astype(np.int64)
+        user_ids = df['username'].map(index).to_numpy(dtype=np.int32)
+        counts = np.full((len(df), len(COUNT_COLUMNS)), MISSING_COUNT,
+                         dtype=np.int32)
+        for i, column in enumerate(COUNT_COLUMNS):
+            if column in df.columns:
+                counts[:, i] = df[column].fillna(MISSING_COUNT).to_numpy()
+        return timestamps, user_ids, counts
+
+    def append(self, rows):
+        """Добавляет записи (timestamp, username, total, easy, medium, hard).
+
+        Сначала данные дописываются в файлы колонок и сбрасываются на диск,
+        затем атомарно обновляется meta.json - только после этого записи
+        видны читателям.
+        """
+        df = pd.DataFrame(rows, columns=CSV_HEADERS)
+        with self.lock():
+            if not self.exists():
+                self.write_frame(df)
+                return
+
+            meta = self.read_meta()
+            timestamps, user_ids, counts = self._encode(df, meta['users'])
+            arrays = [
+                (self.TIMESTAMP_FILE, timestamps),
+                (self.USER_ID_FILE, user_ids),
+                (self.COUNTS_FILE, counts)
+            ]
+            for name, array in arrays:
+                with open(self._file(name, meta['generation']), 'r+b') as f:
+                    # Отбрасываем хвост от прерванной записи, если он есть
+                    f.truncate(meta['rows'] * array[:1].nbytes)
+                    f.seek(0, os.SEEK_END)
+                    f.write(array.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            meta['rows'] += len(df)
+            self._write_meta(meta)
+
+    def write_frame(self, df):
+        """Полностью перезаписывает хранилище данными из DataFrame."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock():
+            self._write_generation(df)
+
+    def _write_generation(self, df):
+        """Записывает новое поколение файлов и переключается на него."""
+        previous = self.read_meta()['generation'] if self.exists() else None
+        generation = 0 if previous is None else previous + 1
+
+        users = []
+        timestamps, user_ids, counts = self._encode(df, users)
+        names = [self.TIMESTAMP_FILE, self.USER_ID_FILE, self.COUNTS_FILE]
+        for name, array in zip(names, [timestamps, user_ids, counts]):
+            with open(self._file(name, generation), 'wb') as f:
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._write_meta({
+            'version': 1,
+            'generation': generation,
+            'rows': len(df),
+            'users': users,
+            'columns': [column for column in COUNT_COLUMNS
+                        if column in df.columns]
+        })
+
+        # Файлы прошлого поколения больше не нужны; уже открытые читателями
+        # отображения продолжают работать до их закрытия
+        if previous is not None:
+            for name in names:
+                try:
+                    os.remove(self._file(name, previous))
+                except FileNotFoundError:
+                    pass
+
+
+class Heartbeat:
+    """Время последней проверки каждого пользователя.
+
+    JSON файл вида {username: {"checked": ..., "recorded": ..., "counts":
+    [total, easy, medium, hard]}}: время последней проверки, время
+    последней записи в историю и значения на момент проверки. Если
+    значения не менялись, сборщик может не записывать замер в историю, а
+    только обновить checked.
+    """
+
+    def __init__(self, path=HEARTBEAT_FILE):
+        self.path = path
+
+    def signature(self):
+        """Возвращает отпечаток файла или None, если его нет."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def read(self):
+        """Читает записи о проверках ({} если файла нет)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write(self, entries):
+        """Атомарно перезаписывает файл."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, self.path)
+
+    def frame(self):
+        """Возвращает непопавшие в историю проверки в длинном формате.
+
+        Для каждого пользователя, последняя проверка которого не записана
+        в историю, возвращается строка со временем этой проверки, чтобы
+        график доходил до нее так же, как при записи каждого замера.
+
+        Returns:
+            DataFrame или None, если таких проверок нет
+        """
+        rows = [
+            [entry['checked'], username, *entry['counts']]
+            for username, entry in self.read().items()
+            if entry['checked'] != entry['recorded']
+        ]
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=CSV_HEADERS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+
+
+def compact_frame(df):
+    """Удаляет повторяющиеся замеры.
+
+    Из каждой серии подряд идущих одинаковых замеров пользователя
+    остаются первый и последний, поэтому графики (ступени между
+    изменениями) строятся так же, как по полной истории.
+
+    Args:
+        df: DataFrame длинного формата
+
+    Returns:
+        DataFrame: оставшиеся записи в исходном порядке
+    """
+    if df.empty:
+        return df
+
+    df = df.reset_index(drop=True)
+    ordered = df.assign(
+        timestamp=pd.to_datetime(df['timestamp'])).sort_values(
+        ['username', 'timestamp'], kind='stable')
+    columns = [column for column in COUNT_COLUMNS if column in df.columns]
+    values = ordered[columns].fillna(MISSING_COUNT).to_numpy()
+    users = ordered['username'].to_numpy()
+
+    # Совпадение с соседней записью того же пользователя
+    same = np.zeros(len(ordered) + 1, dtype=bool)
+    same[1:-1] = (users[1:] == users[:-1]) & (
+        values[1:] == values[:-1]).all(axis=1)
+    inner = same[:-1] & same[1:]
+    return df.loc[np.sort(ordered.index[~inner])]
+
+
+def read_frame(storage):
+    """Читает все записи хранилища в DataFrame длинного формата."""
+    result = storage.read()
+    frames = [df for df in (result.frame, result.pending) if df is not None]
+    if not frames:
+        return pd.DataFrame(columns=CSV_HEADERS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def get_storage(backend=None):
+    """Возвращает хранилище, выбранное в конфигурации."""
+    backend = backend or STORAGE_BACKEND
+    if backend == 'csv':
+        return CsvStorage()
+    if backend == 'numpy':
+        return NumpyStorage()
+    raise ValueError(f"Неизвестный тип хранилища: {backend}")
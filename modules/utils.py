@@ -1,18 +1,11 @@
 """Утилиты для LeetCode Progress Tracker."""
 
+from collections import namedtuple
 
-def get_latest_value(dataframe, username):
-    """Получить последнее значение для пользователя из DataFrame.
+# Фильтр данных: диапазон времени (границы включительно, None - без
+# ограничения) и кортеж пользователей (None - все пользователи)
+DataFilter = namedtuple('DataFilter', ['start', 'end', 'users'])
 
-    Args:
-        dataframe: pandas DataFrame с данными
-        username: имя пользователя для поиска в колонках
+# Интервалы агрегации истории (параметр resolution); None - исходные замеры
+RESOLUTIONS = ('hour', 'day', 'week', 'month')
 
-    Returns:
-        int: Последнее значение для пользователя или 0 если данных нет
-    """
-    if (dataframe.empty or
-        username not in dataframe.columns or
-            dataframe[username].dropna().empty):
-        return 0
-    return dataframe[username].dropna().iloc[-1]
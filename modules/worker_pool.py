@@ -0,0 +1,94 @@
+"""Ограниченный пул потоков для блокирующих вычислений.
+
+Чтение и обработка данных pandas, построение графиков и рендеринг
+выполняются синхронно, поэтому обработчики запросов отправляют эту работу
+в пул, не блокируя цикл событий. Число ожидающих задач ограничено: при
+переполнении очереди запрос сразу получает 503, а задачи, не уложившиеся
+в отведенное время, - 504.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from config import WORKER_THREADS, WORKER_QUEUE_SIZE, WORKER_TIMEOUT_SECONDS
+
+
+class WorkerPool:
+    """Пул с ограничением очереди и временем выполнения задач."""
+
+    def __init__(self, max_workers=WORKER_THREADS, max_queue=WORKER_QUEUE_SIZE,
+                 timeout=WORKER_TIMEOUT_SECONDS, executor_factory=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # Функция создания исполнителя по числу рабочих (по умолчанию - пул
+        # потоков); позволяет использовать тот же учет очереди для процессов
+        self.executor_factory = executor_factory
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Создает пул при первом использовании."""
+        with self._lock:
+            if self._executor is None:
+                if self.executor_factory is not None:
+                    self._executor = self.executor_factory(self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='worker')
+            return self._executor
+
+    def _release(self, future):
+        """Освобождает место в очереди после завершения задачи."""
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func, *args, timeout=None):
+        """Выполняет func(*args) в пуле и возвращает результат.
+
+        Args:
+            func: блокирующая функция
+            timeout: время ожидания в секундах (по умолчанию из конфигурации)
+        """
+        executor = self._get_executor()
+        with self._lock:
+            # Учитываются и выполняющиеся, и ожидающие задачи
+            if self.pending >= self.max_workers + self.max_queue:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Сервер перегружен, повторите запрос позже.",
+                    headers={'Retry-After': '1'})
+            self.pending += 1
+
+        try:
+            future = executor.submit(func, *args)
+        except RuntimeError:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            # Задача, которая еще не начала выполняться, будет отменена;
+            # выполняющаяся занимает место в очереди до своего завершения
+            future.cancel()
+            raise HTTPException(
+                status_code=504,
+                detail="Превышено время обработки запроса.")
+
+    def shutdown(self):
+        """Останавливает пул, отменяя задачи, которые еще не начались."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Создаем глобальный экземпляр
+worker_pool = WorkerPool()
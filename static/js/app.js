@@ -4,11 +4,20 @@
 const CHART_LOAD_TIMEOUT = 10000; // 10 секунд
 const LEGEND_CLICK_DELAY = 0; // Задержка для обновления аннотаций после клика по легенде
 const ANNOTATION_UPDATE_DELAY = 0; // Задержка для обновления аннотаций
+const UPDATE_POLL_INTERVAL = 1000; // Интервал опроса статуса обновления данных
+const USE_BINARY_CHART_DATA = true; // Запрашивать данные графиков в бинарном колоночном формате
+const BINARY_CHART_DATA_TYPE = 'application/vnd.leetcode-tracker.columns';
+const LIVE_UPDATES_ENABLED = true; // Получать новые замеры через /api/stream без перезагрузки страницы
+const ANNOTATION_X_OFFSET_PERCENT = 0.03; // Смещение подписи от последней точки (как в chart_creator.py)
 
 // Переводы и интернационализация
 let currentTranslations = window.translations || {};
 let currentLanguage = window.currentLanguage || 'ru';
 
+// Шаблоны оформления графиков для текущего языка (данные графиков
+// приходят с сервера отдельно и объединяются с шаблоном)
+let chartTemplates = window.chartTemplates || {};
+
 // Утилитарные функции
 function getErrorMessage(error) {
     // Используем систему переводов для сообщений об ошибках
@@ -49,6 +58,9 @@ async function switchLanguage(language) {
             window.translations = result.translations;
             window.currentLanguage = language;
             
+            // Шаблоны графиков содержат подписи на выбранном языке
+            await fetchChartTemplates(language);
+            
             // Обновляем переводы на странице
             updatePageTranslations();
             
@@ -158,9 +170,32 @@ const chartContainers = {
 // Кэш для хранения созданных диаграмм
 let chartsCache = {};
 
+// Конфигурации графиков, полученные через /api/dashboard, но еще не отрисованные
+let dashboardConfigs = {};
+
+// Выполняющийся запрос к /api/dashboard (общий для одновременных загрузок)
+let dashboardRequest = null;
+
+// Были ли уже загружены конфигурации всех графиков
+let dashboardLoaded = false;
+
 // Кэш для хранения оригинальных аннотаций каждого графика
 let originalAnnotations = {};
 
+// Первая и последняя отметка времени рядов отрисованных графиков: {имя ряда: {firstX, lastX}}
+let seriesBounds = {};
+
+// Метрики событий /api/stream, которыми дополняются ряды графиков
+const liveChartMetrics = {
+    'progress': ['progress_total'],
+    'total': ['total'],
+    'difficulty-total': ['easy', 'medium', 'hard'],
+    'difficulty-progress': ['progress_easy', 'progress_medium', 'progress_hard']
+};
+
+// Соединение с потоком новых замеров (EventSource)
+let liveSource = null;
+
 // Счетчик активных загрузок для предотвращения перегрузки сети
 let activeLoadingCount = 0;
 const MAX_CONCURRENT_LOADS = 2;
@@ -212,6 +247,156 @@ function clearChartsCache() {
     
     // Очищаем кэш оригинальных аннотаций
     originalAnnotations = {};
+    seriesBounds = {};
+
+    // Неотрисованные конфигурации построены для прежнего языка
+    dashboardConfigs = {};
+    dashboardLoaded = false;
+}
+
+// Имя графика на сервере (как в /api/plot/*)
+function getServerChartName(chartType) {
+    return chartEndpoints[chartType].replace('/api/plot/', '');
+}
+
+// Загрузка конфигураций нескольких графиков одним запросом
+async function fetchDashboard(chartTypes) {
+    const names = chartTypes.map(getServerChartName).join(',');
+    let timeoutId;
+    let response;
+
+    try {
+        response = await Promise.race([
+            fetch(`/api/dashboard?charts=${encodeURIComponent(names)}`, {
+                headers: {
+                    'Accept': USE_BINARY_CHART_DATA
+                        ? `${BINARY_CHART_DATA_TYPE}, application/json`
+                        : 'application/json'
+                }
+            }),
+            new Promise((_, reject) => {
+                timeoutId = setTimeout(() => reject(new Error(`Превышено время ожидания (${CHART_LOAD_TIMEOUT / 1000} секунд)`)), CHART_LOAD_TIMEOUT);
+            })
+        ]);
+    } finally {
+        // Всегда очищаем таймер, независимо от результата
+        if (timeoutId) {
+            clearTimeout(timeoutId);
+        }
+    }
+
+    if (!response.ok) {
+        throw new Error(`HTTP ошибка: ${response.status} ${response.statusText}`);
+    }
+
+    const payload = await parseDashboardResponse(response);
+    chartTypes.forEach(chartType => {
+        const config = payload.charts[getServerChartName(chartType)];
+        if (config) {
+            dashboardConfigs[chartType] = config;
+        }
+    });
+}
+
+// Разбор ответа /api/dashboard: JSON или бинарный колоночный формат
+async function parseDashboardResponse(response) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (contentType.startsWith(BINARY_CHART_DATA_TYPE)) {
+        return decodeDashboardBinary(await response.arrayBuffer());
+    }
+    return response.json();
+}
+
+// Чтение сигнатуры и JSON-заголовка бинарного ответа (см. modules/binary_format.py).
+// Возвращает заголовок и смещение блока данных
+function readBinaryHeader(buffer, offset, magic) {
+    const signature = String.fromCharCode(...new Uint8Array(buffer, offset, 4));
+    if (signature !== magic) {
+        throw new Error(`Неверный формат данных: ${signature}`);
+    }
+    const headerLength = new DataView(buffer, offset + 4, 4).getUint32(0, true);
+    const headerBytes = new Uint8Array(buffer, offset + 8, headerLength);
+    return {
+        header: JSON.parse(new TextDecoder().decode(headerBytes)),
+        dataOffset: offset + 8 + headerLength
+    };
+}
+
+// Декодирование панели графиков: {charts: {имя: данные графика или {error}}}
+function decodeDashboardBinary(buffer) {
+    const { header, dataOffset } = readBinaryHeader(buffer, 0, 'LCD1');
+    const charts = {};
+    Object.entries(header.charts).forEach(([name, entry]) => {
+        charts[name] = entry.error !== undefined
+            ? entry
+            : decodeChartBinary(buffer, dataOffset + entry.offset);
+    });
+    return { charts };
+}
+
+// Декодирование одного графика: ряды получают data = {x, y} (Float64Array)
+function decodeChartBinary(buffer, offset = 0) {
+    const { header: chartData, dataOffset } = readBinaryHeader(buffer, offset, 'LCC1');
+    (chartData.series || []).forEach(serie => {
+        if (serie.columns) {
+            serie.data = decodeSeriesColumns(buffer, dataOffset, serie.columns);
+            delete serie.columns;
+        }
+    });
+    return chartData;
+}
+
+function decodeSeriesColumns(buffer, dataOffset, columns) {
+    const length = columns.length;
+    const x = new Float64Array(length);
+    if (columns.x.type === 'f64') {
+        x.set(new Float64Array(buffer, dataOffset + columns.x.offset, length));
+    } else {
+        // Время хранится как начало и приращения в единицах unit (мс)
+        const deltas = new Uint32Array(buffer, dataOffset + columns.x.offset, length - 1);
+        let time = columns.x.start;
+        x[0] = time;
+        for (let i = 1; i < length; i++) {
+            time += deltas[i - 1] * columns.x.unit;
+            x[i] = time;
+        }
+    }
+    
+    const y = columns.y.type === 'f64'
+        ? new Float64Array(buffer, dataOffset + columns.y.offset, length)
+        : Float64Array.from(new Int32Array(buffer, dataOffset + columns.y.offset, length));
+    return { x, y };
+}
+
+// Получение конфигурации графика: при первой загрузке страницы
+// запрашиваются сразу все графики, затем - только недостающие
+async function getChartConfig(chartType) {
+    if (!dashboardConfigs[chartType] && dashboardRequest) {
+        await dashboardRequest;
+    }
+
+    if (!dashboardConfigs[chartType]) {
+        const chartTypes = dashboardLoaded ? [chartType] : Object.keys(chartEndpoints);
+        dashboardRequest = fetchDashboard(chartTypes);
+        try {
+            await dashboardRequest;
+            dashboardLoaded = true;
+        } finally {
+            dashboardRequest = null;
+        }
+    }
+
+    // Конфигурация используется один раз: повторная загрузка запросит свежие данные
+    const config = dashboardConfigs[chartType];
+    delete dashboardConfigs[chartType];
+
+    if (!config) {
+        throw new Error(`Chart ${chartType} not found in dashboard response`);
+    }
+    if (config.error) {
+        throw new Error(config.error);
+    }
+    return config;
 }
 
 // Инициализация приложения
@@ -219,6 +404,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeCharts();
     initializeTabs();
     initializeTooltips();
+    initializeLiveUpdates();
     
     // Загружаем первый график без задержки
     const activeTab = document.querySelector('.tab-btn.active');
@@ -350,29 +536,10 @@ async function loadChart(chartType) {
             }
         }
         
-        // Добавляем таймаут для предотвращения долгих ожиданий
-        let timeoutId;
-        let response;
-        
-        try {
-            response = await Promise.race([
-                fetch(endpoint),
-                new Promise((_, reject) => {
-                    timeoutId = setTimeout(() => reject(new Error(`Превышено время ожидания (${CHART_LOAD_TIMEOUT / 1000} секунд)`)), CHART_LOAD_TIMEOUT);
-                })
-            ]);
-        } finally {
-            // Всегда очищаем таймер, независимо от результата
-            if (timeoutId) {
-                clearTimeout(timeoutId);
-            }
-        }
-        
-        if (!response.ok) {
-            throw new Error(`HTTP ошибка: ${response.status} ${response.statusText}`);
-        }
-        
-        const chartConfig = await response.json();
+        // Данные всех графиков приходят одним запросом к /api/dashboard,
+        // оформление берется из шаблона графика
+        const chartConfig = await applyChartTemplate(
+            expandSeriesColumns(await getChartConfig(chartType)));
         
         // Очищаем контейнер от индикатора загрузки
         container.innerHTML = '';
@@ -385,6 +552,7 @@ async function loadChart(chartType) {
         if (chartConfig.annotations && chartConfig.annotations.points) {
             originalAnnotations[chartType] = JSON.parse(JSON.stringify(chartConfig.annotations.points));
         }
+        seriesBounds[chartType] = getSeriesBounds(chartConfig);
         
         // Добавляем обработчики событий для синхронизации аннотаций с легендой
         chart.addEventListener('legendClick', function(chartContext, seriesIndex, config) {
@@ -423,6 +591,77 @@ async function loadChart(chartType) {
     }
 }
 
+// Разворачивает ряды в колоночном формате {x: [...], y: [...]} (массивы
+// или Float64Array из бинарного формата) в пары [x, y]
+function expandSeriesColumns(chartConfig) {
+    (chartConfig.series || []).forEach(serie => {
+        const data = serie.data;
+        if (data && !Array.isArray(data) && data.x && data.y) {
+            const points = new Array(data.x.length);
+            for (let i = 0; i < points.length; i++) {
+                points[i] = [data.x[i], data.y[i]];
+            }
+            serie.data = points;
+        }
+    });
+    return chartConfig;
+}
+
+// Загрузка шаблонов оформления графиков для языка
+async function fetchChartTemplates(language) {
+    const response = await fetch(`/api/chart-templates/${language}`);
+    if (!response.ok) {
+        throw new Error(`HTTP ошибка: ${response.status} ${response.statusText}`);
+    }
+    
+    const result = await response.json();
+    chartTemplates = result.templates;
+    window.chartTemplates = result.templates;
+}
+
+// Объединение данных графика с его шаблоном оформления
+async function applyChartTemplate(chartData) {
+    const { template: templateName, ...data } = chartData;
+    
+    // Шаблоны могли измениться на сервере - загружаем актуальные
+    if (!chartTemplates[templateName]) {
+        await fetchChartTemplates(currentLanguage);
+    }
+    const template = chartTemplates[templateName];
+    if (!template) {
+        throw new Error(`Chart template ${templateName} not found`);
+    }
+    
+    // Шаблон копируется: ApexCharts может изменять переданные настройки
+    const chartConfig = mergeChartOptions(JSON.parse(JSON.stringify(template.options)), data);
+    
+    // Подписи точек получают общее оформление из шаблона
+    if (template.annotation && chartConfig.annotations && chartConfig.annotations.points) {
+        chartConfig.annotations.points = chartConfig.annotations.points.map(point =>
+            mergeChartOptions(JSON.parse(JSON.stringify(template.annotation)), point)
+        );
+    }
+    return chartConfig;
+}
+
+// Рекурсивное слияние настроек: значения из options заменяют значения target,
+// вложенные объекты объединяются, массивы заменяются целиком
+function mergeChartOptions(target, options) {
+    Object.entries(options).forEach(([key, value]) => {
+        const current = target[key];
+        if (isPlainObject(value) && isPlainObject(current)) {
+            mergeChartOptions(current, value);
+        } else {
+            target[key] = value;
+        }
+    });
+    return target;
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
 // Инициализация всех графиков (предзагрузка)
 function initializeCharts() {
     // Инициализируем только активные вкладки при первой загрузке
@@ -502,11 +741,28 @@ async function updateData() {
             }
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        
+        if (result.success && result.job_id) {
+            // Обновление выполняется в фоне - дожидаемся завершения задания
+            const job = await waitForUpdateJob(result.job_id);
+            result = {
+                success: job.status === 'done',
+                message: job.status === 'done'
+                    ? getTranslation('messages.update_success')
+                    : getTranslation('messages.update_failed') + (job.error ? ' ' + job.error : ''),
+                error: job.error
+            };
+        }
         
         if (result.success) {
             message.innerHTML = '<p class="success">✅ ' + result.message + '</p>';
             
+            // Новые замеры и статистика придут через /api/stream
+            if (liveSource && liveSource.readyState === EventSource.OPEN) {
+                return;
+            }
+            
             // Очищаем кэш и перезагружаем текущий график
             Object.keys(chartsCache).forEach(chartType => {
                 if (chartsCache[chartType]) {
@@ -536,6 +792,175 @@ async function updateData() {
     }
 }
 
+// Ожидание завершения фонового задания обновления данных
+async function waitForUpdateJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, UPDATE_POLL_INTERVAL));
+        
+        const response = await fetch(`/api/update/${jobId}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ошибка: ${response.status} ${response.statusText}`);
+        }
+        
+        const job = await response.json();
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+    }
+}
+
+// Подключение к потоку новых замеров: графики и статистика обновляются без перезагрузки
+function initializeLiveUpdates() {
+    if (!LIVE_UPDATES_ENABLED || !window.EventSource) {
+        return;
+    }
+    
+    // since - последний замер на странице: пропущенные после ее загрузки
+    // замеры придут первым событием; при переподключении браузер сам
+    // передает id последнего события (Last-Event-ID)
+    const since = window.lastSampleTime;
+    liveSource = new EventSource(since
+        ? `/api/stream?since=${encodeURIComponent(since)}`
+        : '/api/stream');
+    
+    liveSource.addEventListener('samples', event => {
+        try {
+            applyLiveSamples(JSON.parse(event.data));
+        } catch (error) {
+            console.error('Failed to apply live samples:', error);
+        }
+    });
+    liveSource.onerror = () => {
+        console.warn('Live updates connection lost, reconnecting');
+    };
+    window.addEventListener('beforeunload', () => liveSource.close());
+}
+
+// Применение события с новыми замерами
+function applyLiveSamples(update) {
+    updateLiveStats(update.stats || {}, update.last_update);
+    
+    const samples = update.samples || {};
+    if (!Object.keys(samples).length) {
+        return;
+    }
+    
+    // Неотрисованные конфигурации построены по прежним данным
+    dashboardConfigs = {};
+    
+    Object.keys(chartsCache).forEach(chartType => {
+        const chart = chartsCache[chartType];
+        if (!liveChartMetrics[chartType] || !appendLiveSamples(chartType, chart, samples)) {
+            // Агрегированные графики (по дням, неделям, итоги) и графики
+            // с новыми рядами строятся заново
+            reloadLiveChart(chartType);
+        }
+    });
+}
+
+// Дополнение рядов графика новыми точками; false - нужен новый ряд (график перестраивается)
+function appendLiveSamples(chartType, chart, samples) {
+    const bounds = seriesBounds[chartType] || {};
+    const isDifficultyChart = chartType.startsWith('difficulty-');
+    const newPoints = {};
+    
+    for (const metric of liveChartMetrics[chartType]) {
+        const level = metric.replace('progress_', '');
+        const suffix = isDifficultyChart
+            ? ` (${level.charAt(0).toUpperCase() + level.slice(1)})`
+            : '';
+        
+        for (const [username, points] of Object.entries(samples[metric] || {})) {
+            const name = username + suffix;
+            if (!bounds[name]) {
+                return false;
+            }
+            // Точки, уже полученные с данными графика, пропускаем
+            const fresh = points.filter(point => point[0] > bounds[name].lastX);
+            if (fresh.length) {
+                newPoints[name] = fresh;
+            }
+        }
+    }
+    
+    if (!Object.keys(newPoints).length) {
+        return true;
+    }
+    
+    // appendData принимает новые точки для рядов в их порядке на графике
+    chart.appendData(chart.w.config.series.map(serie =>
+        newPoints[serie.name] ? { data: newPoints[serie.name] } : null
+    ));
+    
+    // Подписи переносим к новым последним точкам рядов
+    Object.entries(newPoints).forEach(([name, points]) => {
+        const last = points[points.length - 1];
+        bounds[name].lastX = last[0];
+        
+        const annotation = (originalAnnotations[chartType] || []).find(item =>
+            item.label && item.label.text === name
+        );
+        if (annotation) {
+            const { firstX, lastX } = bounds[name];
+            annotation.x = lastX - (lastX - firstX) * ANNOTATION_X_OFFSET_PERCENT;
+            annotation.y = last[1];
+        }
+    });
+    updateAnnotationsLocally(chartType, chart);
+    return true;
+}
+
+// Перестроение графика по свежим данным: активный - сразу, остальные - при открытии вкладки
+function reloadLiveChart(chartType) {
+    chartsCache[chartType].destroy();
+    delete chartsCache[chartType];
+    delete originalAnnotations[chartType];
+    delete seriesBounds[chartType];
+    
+    const container = document.getElementById(chartType + '-chart');
+    if (container && container.classList.contains('active')) {
+        safeLoadChart(chartType).catch(error => {
+            console.error(`Failed to reload chart ${chartType}: ${getErrorMessage(error)}`);
+        });
+    }
+}
+
+// Первая и последняя отметка времени каждого ряда графика
+function getSeriesBounds(chartConfig) {
+    const bounds = {};
+    (chartConfig.series || []).forEach(serie => {
+        const data = serie.data;
+        if (Array.isArray(data) && data.length && Array.isArray(data[0])) {
+            bounds[serie.name] = {
+                firstX: data[0][0],
+                lastX: data[data.length - 1][0]
+            };
+        }
+    });
+    return bounds;
+}
+
+// Обновление статистики пользователей и времени последнего обновления
+function updateLiveStats(stats, lastUpdate) {
+    document.querySelectorAll('.user-stat[data-username]').forEach(element => {
+        const values = stats[element.dataset.username];
+        if (!values) {
+            return;
+        }
+        element.querySelectorAll('[data-stat]').forEach(field => {
+            const value = values[field.dataset.stat];
+            if (value !== undefined) {
+                field.textContent = value;
+            }
+        });
+    });
+    
+    const lastUpdateElement = document.getElementById('lastUpdate');
+    if (lastUpdate && lastUpdateElement) {
+        lastUpdateElement.textContent = lastUpdate;
+    }
+}
+
 // Функция для переключения видимости уровня сложности
 function toggleDifficultyLevel(chartType, difficulty) {
     const chart = chartsCache[chartType];
@@ -0,0 +1,35 @@
+"""Тесты условных запросов к готовым ответам (ETag, 304 Not Modified)."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+
+client = TestClient(app)
+
+
+def vary(response):
+    return {item.strip().lower()
+            for item in response.headers.get('vary', '').split(',')
+            if item.strip()}
+
+
+@pytest.mark.parametrize('accept_encoding', ['gzip', 'identity'])
+@pytest.mark.parametrize('path', [
+    '/api/plot/daily-progress',
+    '/api/translations/en',
+])
+def test_not_modified_has_same_validators(path, accept_encoding):
+    headers = {'Accept-Encoding': accept_encoding}
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['etag']
+
+    not_modified = client.get(
+        path, headers={**headers, 'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['etag'] == etag
+    assert 'accept-encoding' in vary(response)
+    assert vary(not_modified) == vary(response)
+    for name in ('last-modified', 'cache-control'):
+        assert not_modified.headers[name] == response.headers[name]
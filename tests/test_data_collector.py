@@ -0,0 +1,207 @@
+"""Тесты сборщика данных на локальном GraphQL сервере-заглушке."""
+
+import asyncio
+import csv
+import functools
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import data_collector
+
+
+def user_counts(username):
+    """Детерминированная статистика пользователя для заглушки."""
+    easy = len(username) * 3
+    medium = sum(map(ord, username)) % 50
+    hard = len(username) % 7
+    return easy, medium, hard
+
+
+def matched_user(username):
+    """Ответ matchedUser в формате LeetCode или None для неизвестных."""
+    if username.startswith('missing'):
+        return None
+    easy, medium, hard = user_counts(username)
+    return {"submitStats": {"acSubmissionNum": [
+        {"difficulty": "All", "count": easy + medium + hard},
+        {"difficulty": "Easy", "count": easy},
+        {"difficulty": "Medium", "count": medium},
+        {"difficulty": "Hard", "count": hard},
+    ]}}
+
+
+class StandInServer:
+    """GraphQL сервер-заглушка: отвечает на одиночные и пакетные запросы.
+
+    Запоминает число запросов, наибольшее число одновременно
+    обрабатываемых запросов и клиентские соединения.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: соединения остаются открытыми между запросами
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                payload = json.loads(self.rfile.read(length))
+                status, body, headers = server.handle(
+                    payload, self.client_address)
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/graphql'
+
+    def handle(self, payload, client_address):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.connections.add(client_address)
+        try:
+            time.sleep(self.delay)
+            return self.respond(payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def respond(self, payload):
+        """Возвращает (статус, тело, заголовки) ответа."""
+        variables = payload['variables']
+        if 'username' in variables:
+            data = {"matchedUser": matched_user(variables['username'])}
+        else:
+            data = {alias: matched_user(username)
+                    for alias, username in variables.items()}
+        return 200, {"data": data}, {}
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+USERS = [f'user{i}' for i in range(23)] + ['missing0', 'iris0o']
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_concurrent_fetch_matches_sequential_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_collector, 'USERNAMES', USERS)
+
+    with StandInServer() as server:
+        monkeypatch.setattr(
+            data_collector, 'fetch_all_stats', functools.partial(
+                data_collector.fetch_all_stats, url=server.url,
+                concurrency=4, batch_size=5))
+        summary = data_collector.update_progress_data(changes_only=False)
+
+        # Последовательный путь: по одному запросу на пользователя
+        sequential = {
+            username: data_collector.get_leetcode_stats(
+                username, url=server.url)
+            for username in USERS}
+
+    rows = read_rows(tmp_path / 'leetcode_progress.csv')
+    assert rows[0] == ['timestamp', 'username', 'total_solved',
+                       'easy_solved', 'medium_solved', 'hard_solved']
+    expected = [
+        [summary['timestamp'], username, str(stats['total']),
+         str(stats['easy']), str(stats['medium']), str(stats['hard'])]
+        for username, stats in sequential.items() if stats is not None]
+    assert rows[1:] == expected
+    assert summary['failed'] == ['missing0']
+
+
+def test_concurrency_limit_and_session_reuse():
+    with StandInServer(delay=0.05) as server:
+        results = asyncio.run(data_collector.fetch_all_stats(
+            USERS, concurrency=3, url=server.url, batch_size=1))
+
+    assert list(results) == USERS
+    assert results['missing0'] is None
+    assert results['iris0o']['easy'] == user_counts('iris0o')[0]
+    assert server.requests == len(USERS)
+    # Одновременно выполняется не больше concurrency запросов, а
+    # соединения пула используются повторно
+    assert server.max_in_flight == 3
+    assert len(server.connections) <= 3
+
+
+class RateLimitedServer(StandInServer):
+    """Заглушка, всегда отвечающая 429 Too Many Requests."""
+
+    def respond(self, payload):
+        return 429, {"errors": [{"message": "rate limited"}]}, {
+            'Retry-After': '0'}
+
+
+class LimitedBatchServer(StandInServer):
+    """Заглушка, отклоняющая пакеты больше max_batch пользователей."""
+
+    max_batch = 4
+
+    def respond(self, payload):
+        if len(payload['variables']) > self.max_batch:
+            return 200, {"errors": [{"message": "query too complex"}]}, {}
+        return super().respond(payload)
+
+
+def test_batches_reduce_request_count():
+    with StandInServer() as server:
+        results = asyncio.run(data_collector.fetch_all_stats(
+            USERS, concurrency=4, url=server.url, batch_size=10))
+        single = data_collector.get_leetcode_stats('user7', url=server.url)
+
+    assert server.requests == 3 + 1
+    assert results['user7'] == single
+    assert results['missing0'] is None
+
+
+def test_rejected_batch_is_split():
+    users = [f'user{i}' for i in range(16)]
+    with LimitedBatchServer() as server:
+        results = asyncio.run(data_collector.fetch_all_stats(
+            users, concurrency=4, url=server.url, batch_size=16))
+
+    # 16 -> 2 x 8 -> 4 x 4: 1 + 2 + 4 запроса
+    assert server.requests == 7
+    assert all(results[username] is not None for username in users)
+
+
+def test_rate_limited_batch_is_retried_not_split():
+    with RateLimitedServer() as server:
+        results = asyncio.run(data_collector.fetch_all_stats(
+            USERS, concurrency=4, url=server.url, batch_size=20))
+
+    # Два пакета, каждый - первая попытка и COLLECTOR_RETRIES повторов
+    assert server.requests == 2 * (data_collector.COLLECTOR_RETRIES + 1)
+    assert list(results) == USERS
+    assert all(stats is None for stats in results.values())